@@ -1,32 +1,182 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from endee import Endee, Precision
+from endee.endee import SessionManager
 from validators import (
     validate_index_name, 
     validate_dimension, 
     validate_vector, 
     validate_top_k, 
     validate_choice,
-    validate_sparse_dimension
+    validate_sparse_dimension,
+    validate_sparse_vector,
+    validate_vector_batch,
+    validate_fields,
+    validate_fusion,
+    validate_ids,
+    validate_metadata_matches,
+    validate_meta_updates
 )
+from local_backend import LocalEndee
+from index_cache import IndexCache
+from fusion import FUSION_MODES, fuse_weighted, fuse_rrf
+from result_cache import QueryResultCache
+from bulk_upsert import (
+    MAX_VECTORS_PER_BATCH,
+    is_ndjson_request,
+    iter_slices,
+    iter_ndjson_slices,
+    upsert_slices
+)
+from mutations import REQUANTIZED_PRECISIONS, delete_ids, delete_matching, update_metadata
+from wire_format import is_msgpack_request, decode_msgpack_body, to_list
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import threading
+import json
 import os
+import tempfile
+
+# JSON encoding of the responses is recorded as the "serialization" stage
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with metrics.time_stage("serialization"):
+            return super().dumps(obj, **kwargs)
+
 
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
 CORS(app)
+metrics.init_app(app)
+
+# Validation time is recorded separately from the DB calls and serialization
+validate_vector = metrics.timed_stage("validation")(validate_vector)
+validate_sparse_vector = metrics.timed_stage("validation")(validate_sparse_vector)
+validate_vector_batch = metrics.timed_stage("validation")(validate_vector_batch)
 
 db_url = os.getenv("ENDEE_DB_URL", "http://localhost:8080")
-client = Endee()
-client.set_base_url(f"{db_url}/api/v1")
+ENDEE_POOL_SIZE = int(os.getenv("ENDEE_POOL_SIZE", "16"))
+
+if db_url.startswith("local://"):
+    # In-process NumPy stand-in for endee-db (development and benchmarks)
+    client = LocalEndee()
+else:
+    client = Endee()
+    client.set_base_url(f"{db_url}/api/v1")
+
+    # Bounded keep-alive pool towards endee-db, shared by every thread of this
+    # worker. With pool_block the threads wait for a free connection instead
+    # of opening extra ones when the pool is exhausted. The SDK does not retry:
+    # writes are retried, on transient errors only, by call_with_retries
+    # (bulk_upsert.py) and not a second time underneath it.
+    client.session_manager = SessionManager(
+        pool_connections=1,
+        pool_maxsize=ENDEE_POOL_SIZE,
+        max_retries=0,
+        pool_block=True
+    )
+
+# The SDK memoises get_index() forever, so go around it to let the TTL
+# and the explicit invalidation below actually refresh the metadata.
+def load_index(index_name):
+    loader = getattr(client.get_index, "__wrapped__", None)
+    with metrics.time_db_call("get_index"):
+        if loader is None:
+            return client.get_index(name=index_name)
+        return loader(client, index_name)
+
+INDEX_CACHE_TTL = float(os.getenv("INDEX_CACHE_TTL", "300"))
+index_cache = IndexCache(loader=load_index, ttl=INDEX_CACHE_TTL)
+
+# LRU cache of query results, invalidated per index on every upsert.
+# The generation counters live in QUERY_CACHE_GENERATION_DIR, shared by the
+# gunicorn workers of the host, so an upsert on one worker invalidates all;
+# they are re-read at most every QUERY_CACHE_GENERATION_CHECK_MS.
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+QUERY_CACHE_QUANTUM = float(os.getenv("QUERY_CACHE_QUANTUM", "1e-4"))
+QUERY_CACHE_GENERATION_DIR = os.getenv(
+    "QUERY_CACHE_GENERATION_DIR",
+    os.path.join(tempfile.gettempdir(), "endee-service-cache-generations")
+)
+QUERY_CACHE_GENERATION_CHECK_MS = float(os.getenv("QUERY_CACHE_GENERATION_CHECK_MS", "100"))
+result_cache = QueryResultCache(
+    max_entries=QUERY_CACHE_SIZE,
+    ttl=QUERY_CACHE_TTL,
+    quantum=QUERY_CACHE_QUANTUM,
+    generation_dir=QUERY_CACHE_GENERATION_DIR or None,
+    generation_check_interval=QUERY_CACHE_GENERATION_CHECK_MS / 1000
+)
+
+# Batch queries are fanned out to endee-db on a shared, bounded pool
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "64"))
+QUERY_BATCH_WORKERS = int(os.getenv("QUERY_BATCH_WORKERS", "8"))
+query_executor = ThreadPoolExecutor(max_workers=QUERY_BATCH_WORKERS)
+
+# endee-db returns at most 512 neighbours, which caps fusion over-fetching
+MAX_TOP_K = 512
+
+# Large upserts are cut into slices of the DB insert limit and sent in parallel
+UPSERT_SLICE_SIZE = min(int(os.getenv("UPSERT_SLICE_SIZE", "1000")), MAX_VECTORS_PER_BATCH)
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+UPSERT_MAX_IN_FLIGHT = int(os.getenv("UPSERT_MAX_IN_FLIGHT", "8"))
+UPSERT_RETRIES = int(os.getenv("UPSERT_RETRIES", "3"))
+upsert_executor = ThreadPoolExecutor(max_workers=UPSERT_WORKERS)
+
+# Meta keys copied into the vector filter on upsert; they are the ones
+# delete-by-metadata can match on (endee-db deletes by filter only)
+FILTER_FIELDS = tuple(f.strip() for f in os.getenv("FILTER_FIELDS", "source").split(",") if f.strip())
+# Deletes and metadata updates share the upsert pool and retry settings
+MAX_MUTATION_BATCH = int(os.getenv("MAX_MUTATION_BATCH", "10000"))
+MAX_DELETE_MATCHES = int(os.getenv("MAX_DELETE_MATCHES", "100"))
 
 
 # Initialize Endee client
 # client = Endee()
 
+# Limit on requests handled at the same time by one worker (0 = no limit).
+# Requests that cannot get a slot within REQUEST_QUEUE_TIMEOUT get a 503.
+# The default stays below the worker's gunicorn threads, otherwise the
+# thread pool is exhausted first and the limit never applies.
+GUNICORN_THREADS = int(os.getenv("GUNICORN_THREADS", "16"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", str(max(1, GUNICORN_THREADS * 3 // 4))))
+REQUEST_QUEUE_TIMEOUT = float(os.getenv("REQUEST_QUEUE_TIMEOUT", "10"))
+request_slots = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS) if MAX_CONCURRENT_REQUESTS > 0 else None
+
+
+@app.before_request
+def acquire_request_slot():
+    if request_slots is None:
+        return None
+    if not request_slots.acquire(timeout=REQUEST_QUEUE_TIMEOUT):
+        return jsonify({
+            "error": "Server is busy, please retry"
+        }), 503
+    g.request_slot = True
+    return None
+
+
+@app.teardown_request
+def release_request_slot(exc):
+    if g.pop("request_slot", False):
+        request_slots.release()
+
 """
 get_json can return None if the body is not valid JSON, 
-so we can use a helper function to handle that case
+so we can use a helper function to handle that case.
+Bodies sent as application/msgpack (binary vectors) are decoded here as well.
 """
+@metrics.timed_stage("parse")
 def get_json_or_error():
+    if is_msgpack_request(request):
+        data, error = decode_msgpack_body(request.get_data())
+        if error:
+            return None, jsonify({
+                "error": error
+            }), 400
+        return data, None, None
+
     data = request.get_json(silent=True)
     if not data:
         return None, jsonify({
@@ -34,6 +184,329 @@ def get_json_or_error():
         }), 400
     return data, None, None
 
+
+# Fields a query result can carry, and the ones returned when "fields" is omitted
+RESULT_FIELDS = {
+    "id": lambda r: r.get("id"),
+    "similarity": lambda r: r.get("similarity"),
+    "distance": lambda r: r.get("distance"),
+    "text": lambda r: r.get("meta", {}).get("text"),
+    "description": lambda r: r.get("meta", {}).get("description", ""),
+    "title": lambda r: r.get("meta", {}).get("title", ""),
+    "source": lambda r: r.get("meta", {}).get("source", ""),
+    "vector": lambda r: r.get("vector", []),
+}
+DEFAULT_FIELDS = ("id", "similarity", "distance", "text", "description", "title")
+
+
+# Normalize the raw Endee results into the response format, keeping only `fields`
+def clean_results(raw_results, fields=DEFAULT_FIELDS):
+    getters = [(field, RESULT_FIELDS[field]) for field in fields]
+    return [
+        {field: getter(r) for field, getter in getters}
+        for r in raw_results
+    ]
+
+
+"""
+Reads the optional "fields" projection of a query. include_vectors=True
+keeps its old meaning and adds "vector" to the projection; vectors are only
+requested from endee-db when they end up in the response.
+"""
+def select_fields(data, include_vectors, default=DEFAULT_FIELDS):
+    fields = data.get("fields", default)
+    error = validate_fields(fields, RESULT_FIELDS)
+    if error:
+        return None, error
+    fields = tuple(dict.fromkeys(fields))
+    if include_vectors and "vector" not in fields:
+        fields += ("vector",)
+    return fields, None
+
+
+"""
+Validates every entry of a batch query against the index in one pass.
+Returns the list of normalized queries and a list of {"position", "error"}
+so the caller can reject the whole batch before anything reaches endee-db.
+"""
+def validate_batch_queries(queries, index, hybrid=False, default_fields=DEFAULT_FIELDS):
+    if not isinstance(queries, list) or not queries:
+        return None, [{"position": None, "error": "queries must be a non-empty list"}]
+    if len(queries) > MAX_BATCH_QUERIES:
+        return None, [{
+            "position": None,
+            "error": f"A batch can hold at most {MAX_BATCH_QUERIES} queries"
+        }]
+
+    normalized, errors = [], []
+    for position, query in enumerate(queries):
+        if not isinstance(query, dict):
+            errors.append({"position": position, "error": "each query must be an object"})
+            continue
+
+        vector = query.get("vector")
+        error = validate_vector(vector)
+        if not error and len(vector) != index.dimension:
+            error = f"vectors should be of the dimensions {index.dimension}"
+
+        top_k = query.get("top_k", 5)
+        error = error or validate_top_k(top_k)
+
+        include_vectors = query.get("include_vectors", False)
+        if not error and not isinstance(include_vectors, bool):
+            error = "include_vectors must be a Boolean Value"
+
+        fields = None
+        if not error:
+            fields, error = select_fields(query, include_vectors, default=default_fields)
+
+        item = {
+            "vector": to_list(vector),
+            "top_k": top_k,
+            "include_vectors": bool(fields) and "vector" in fields,
+            "fields": fields
+        }
+
+        if hybrid and not error:
+            sparse_indices, sparse_values = query.get("sparse_indices"), query.get("sparse_values")
+            error = validate_sparse_vector(sparse_indices, sparse_values, index.sparse_dim)
+            item["sparse_indices"] = to_list(sparse_indices)
+            item["sparse_values"] = to_list(sparse_values)
+
+        if error:
+            errors.append({"position": position, "error": error})
+        else:
+            normalized.append(item)
+
+    return normalized, errors
+
+
+# Runs one query through the result cache, only hitting endee-db on a miss
+def cached_query(index_name, index, query):
+    query = dict(query)
+    fields = query.pop("fields", DEFAULT_FIELDS)
+    key = result_cache.make_key(index_name, fields=fields, **query)
+    results = result_cache.get(key)
+    if results is None:
+        results = clean_results(timed_query(index, query), fields)
+        result_cache.put(key, results)
+    return results
+
+
+# Reads the optional fusion settings of /index/hybrid/query. Only the settings
+# the chosen mode uses are returned (and echoed back): endee-db fuses "native"
+# queries itself, so alpha, overfetch and rrf_k are rejected there.
+def read_fusion_options(data):
+    options = {
+        "fusion": data.get("fusion", "native"),
+        "alpha": data.get("alpha", 0.5),
+        "overfetch": data.get("overfetch", 2),
+        "rrf_k": data.get("rrf_k", 60),
+    }
+    error = validate_fusion(
+        options["fusion"], options["alpha"], options["overfetch"], options["rrf_k"], FUSION_MODES
+    )
+    if error:
+        return None, error
+    if options["fusion"] == "native":
+        unused = [name for name in ("alpha", "overfetch", "rrf_k") if name in data]
+        if unused:
+            return None, f"{', '.join(unused)} cannot be used with the native fusion mode"
+        return {"fusion": "native"}, None
+    if options["fusion"] != "rrf":
+        if "rrf_k" in data:
+            return None, "rrf_k only applies to the rrf fusion mode"
+        del options["rrf_k"]
+    return options, None
+
+
+def timed_query(index, query):
+    with metrics.time_db_call("query"):
+        return index.query(**query)
+
+
+"""
+Hybrid search with client-side fusion: a dense-only and a sparse-only query
+run concurrently, each over-fetching top_k * overfetch candidates, and the
+two lists are fused with a weighted score or reciprocal-rank fusion.
+alpha=1 or alpha=0 skips the side that has no weight.
+"""
+def fused_query(index_name, index, query, options):
+    query = dict(query)
+    fields = query.pop("fields", DEFAULT_FIELDS)
+    key = result_cache.make_key(
+        index_name, fields=fields, options=tuple(sorted(options.items())), **query
+    )
+    results = result_cache.get(key)
+    if results is not None:
+        return results
+
+    top_k, alpha = query["top_k"], options["alpha"]
+    candidates_k = min(top_k * options["overfetch"], MAX_TOP_K)
+    dense_future = sparse_future = None
+    if alpha > 0:
+        dense_future = query_executor.submit(timed_query, index, {
+            "vector": query["vector"],
+            "top_k": candidates_k,
+            "include_vectors": query["include_vectors"]
+        })
+    if alpha < 1:
+        sparse_future = query_executor.submit(timed_query, index, {
+            "sparse_indices": query["sparse_indices"],
+            "sparse_values": query["sparse_values"],
+            "top_k": candidates_k,
+            "include_vectors": query["include_vectors"]
+        })
+    dense_results = dense_future.result() if dense_future else []
+    sparse_results = sparse_future.result() if sparse_future else []
+
+    if options["fusion"] == "rrf":
+        fused = fuse_rrf(dense_results, sparse_results, alpha, top_k, rrf_k=options["rrf_k"])
+    else:
+        fused = fuse_weighted(dense_results, sparse_results, alpha, top_k)
+
+    results = clean_results(fused, fields)
+    result_cache.put(key, results)
+    return results
+
+
+# Runs the validated queries concurrently and keeps the request order
+def run_batch_queries(index_name, index, queries):
+    futures = [
+        query_executor.submit(cached_query, index_name, index, query)
+        for query in queries
+    ]
+    return [
+        {"top_k": query["top_k"], "results": future.result()}
+        for query, future in zip(queries, futures)
+    ]
+
+
+# Shared body of the two batch routes
+def batch_query(hybrid):
+    data, err_resp, err_status = get_json_or_error()
+    if err_resp is not None:
+        return err_resp, err_status
+
+    index_name = data.get("index_name")
+    error = validate_index_name(index_name)
+    if error:
+        return jsonify({
+            "error": error
+        }), 400
+
+    # A batch-level "fields" applies to every query that does not set its own
+    default_fields, error = select_fields(data, False)
+    if error:
+        return jsonify({
+            "error": error
+        }), 400
+
+    index = index_cache.get(index_name)
+    queries, errors = validate_batch_queries(
+        data.get("queries"), index, hybrid=hybrid, default_fields=default_fields
+    )
+    if errors:
+        return jsonify({
+            "error": "Invalid queries in batch",
+            "errors": errors
+        }), 400
+
+    return jsonify({
+        "index_name": index_name,
+        "count": len(queries),
+        "results": run_batch_queries(index_name, index, queries)
+    })
+
+"""
+Reads the upsert body and returns (index_name, index, slices, error_response).
+JSON and msgpack bodies are validated as a whole before anything is sent.
+NDJSON bodies start with a header line {"index_name": ...} followed by one
+vector per line; they are read and validated slice by slice while earlier
+slices are already being upserted.
+"""
+def read_upsert_request(hybrid):
+    if is_ndjson_request(request):
+        lines = iter(request.stream)
+        try:
+            data = json.loads(next(lines, b"") or b"null")
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return None, None, None, (jsonify({
+                "error": "The first NDJSON line must be a JSON object with index_name"
+            }), 400)
+    else:
+        data, err_resp, err_status = get_json_or_error()
+        if err_resp is not None:
+            return None, None, None, (err_resp, err_status)
+
+    index_name = data.get("index_name")
+    error = validate_index_name(index_name)
+    if error:
+        return None, None, None, (jsonify({
+            "error": error
+        }), 400)
+
+    index = index_cache.get(index_name)
+    sparse_dim = index.sparse_dim if hybrid else None
+
+    if is_ndjson_request(request):
+        slices = iter_ndjson_slices(
+            lines,
+            UPSERT_SLICE_SIZE,
+            lambda items: validate_vector_batch(items, index.dimension, sparse_dim=sparse_dim)
+        )
+        return index_name, index, slices, None
+
+    embedded_vectors = data.get("embedded_vectors")
+    if not embedded_vectors or not isinstance(embedded_vectors, list):
+        return None, None, None, (jsonify({
+            "error": "embedded_vectors is required and must be a list"
+        }), 400)
+
+    # Whole batch checked at once: dimension, NaN/Inf and (hybrid) sparse bounds/lengths
+    errors = validate_vector_batch(embedded_vectors, index.dimension, sparse_dim=sparse_dim)
+    if errors:
+        return None, None, None, (jsonify({
+            "error": "Invalid vectors in batch",
+            "errors": errors
+        }), 400)
+
+    slices = (
+        (start, items, None)
+        for start, items in iter_slices(embedded_vectors, UPSERT_SLICE_SIZE)
+    )
+    return index_name, index, slices, None
+
+
+# Shared body of the two upsert routes: 200 when every slice made it, 207 otherwise
+def bulk_upsert(hybrid):
+    index_name, index, slices, err = read_upsert_request(hybrid)
+    if err is not None:
+        return err
+
+    report = upsert_slices(
+        upsert_executor,
+        index,
+        slices,
+        max_in_flight=UPSERT_MAX_IN_FLIGHT,
+        retries=UPSERT_RETRIES,
+        filter_fields=FILTER_FIELDS
+    )
+    if report["count"]:
+        result_cache.bump_generation(index_name)
+
+    route = request.url_rule.rule
+    metrics.VECTORS_UPSERTED.inc(report["count"], route=route)
+    if report["vectors_per_second"] is not None:
+        metrics.UPSERT_THROUGHPUT.set(report["vectors_per_second"], route=route)
+
+    if not report["failed_slices"]:
+        return jsonify({"status": "vectors upserted", **report})
+    return jsonify({"status": "vectors partially upserted", **report}), 207
+
+
 # -----------------------------
 # Create Single Index
 @app.route("/index/create", methods=["POST"])
@@ -75,12 +548,15 @@ def create_index():
                 "error": error
             }), 400
 
-        client.create_index(
-            name=index_name,
-            dimension=dimension,
-            space_type=space_type,
-            precision=Precision[precision]
-        )
+        with metrics.time_db_call("create_index"):
+            client.create_index(
+                name=index_name,
+                dimension=dimension,
+                space_type=space_type,
+                precision=Precision(precision.lower())
+            )
+
+        index_cache.put(index_name, load_index(index_name))
 
         return jsonify({
             "status": "index created", 
@@ -107,7 +583,7 @@ def get_index():
                 "error": error
             }), 400
 
-        index = client.get_index(name=index_name)
+        index_cache.get(index_name)
 
         return jsonify({"status": "index loaded", "index_name": index_name})
     except Exception as e:
@@ -119,31 +595,7 @@ def get_index():
 @app.route("/index/upsert", methods=["POST"])
 def upsert_vectors():
     try:
-        data, err_resp, err_status = get_json_or_error()
-        if err_resp is not None:
-            return err_resp, err_status
-
-        index_name = data.get("index_name")
-        error = validate_index_name(index_name)
-        if error:
-            return jsonify({
-                "error": error
-            }), 400
-        
-        embedded_vectors = data.get("embedded_vectors")
-        if not embedded_vectors or not isinstance(embedded_vectors, list):
-            return jsonify({
-                "error": "embedded_vectors is required and must be a list"
-            }), 400
-        
-        index = client.get_index(name=index_name)
-        index.upsert(embedded_vectors)
-
-        return jsonify({
-            "status": "vectors upserted", 
-            "count": len(embedded_vectors)
-        })
-    
+        return bulk_upsert(hybrid=False)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -171,7 +623,7 @@ def query_index():
                 "error": error
             }), 400
         
-        index = client.get_index(name=index_name)
+        index = index_cache.get(index_name)
         dimension = index.dimension
         if dimension != len(vector):
             return jsonify({
@@ -191,24 +643,18 @@ def query_index():
                 "error": "include_vectors must be a Boolean Value"
             }), 400
 
-        raw_results = index.query(
-            vector=vector,
-            top_k=top_k,
-            include_vectors=include_vectors
-        )
+        fields, error = select_fields(data, include_vectors)
+        if error:
+            return jsonify({
+                "error": error
+            }), 400
 
-        # Normalize response
-        cleaned_results = [
-            {
-                "id": r.get("id"),
-                "similarity": r.get("similarity"),
-                "distance": r.get("distance"),
-                "text": r.get("meta", {}).get("text"),
-                "description": r.get("meta", {}).get("description", ""),
-                "title": r.get("meta").get("title", "")
-            }
-            for r in raw_results
-        ]
+        cleaned_results = cached_query(index_name, index, {
+            "vector": to_list(vector),
+            "top_k": top_k,
+            "include_vectors": "vector" in fields,
+            "fields": fields
+        })
 
         return jsonify({
             "index_name": index_name,
@@ -220,6 +666,16 @@ def query_index():
         return jsonify({"error": str(e)}), 500
 
 
+# -----------------------------
+# Batch Query: several dense vectors in one request
+@app.route("/index/query/batch", methods=["POST"])
+def query_index_batch():
+    try:
+        return batch_query(hybrid=False)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # -----------------------------
 # HYBRID SEARCH logic Implementation
 @app.route("/index/hybrid/create", methods=["POST"])
@@ -267,13 +723,16 @@ def create_hybrid_index():
                 "error": error
             }), 400
 
-        client.create_index(
-            name=index_name,
-            dimension=dimension,
-            sparse_dim=sparse_dimension,
-            space_type=space_type,
-            precision=Precision[precision]
-        )
+        with metrics.time_db_call("create_index"):
+            client.create_index(
+                name=index_name,
+                dimension=dimension,
+                sparse_dim=sparse_dimension,
+                space_type=space_type,
+                precision=Precision(precision.lower())
+            )
+
+        index_cache.put(index_name, load_index(index_name))
 
         return jsonify({
             "status": "Hybrid index created", 
@@ -288,30 +747,7 @@ def create_hybrid_index():
 @app.route("/index/hybrid/upsert", methods=["POST"])
 def upsert_hybrid_vectors():
     try:
-        data, err_resp, err_status = get_json_or_error()
-        if err_resp is not None:
-            return err_resp, err_status
-
-        index_name = data.get("index_name")
-        error = validate_index_name(index_name)
-        if error:
-            return jsonify({
-                "error": error
-            }), 400
-        
-        embedded_vectors = data.get("embedded_vectors")
-        # The dimensions will be checked at the frontend itself.
-        if not embedded_vectors or not isinstance(embedded_vectors, list):
-            return jsonify({
-                "error": "embedded_vectors is required and must be a list"
-            }), 400
-
-        # Getting the index data
-        index = client.get_index(name=index_name)
-
-        index.upsert(embedded_vectors)
-        return jsonify({"status": "vectors upserted", "count": len(embedded_vectors)})
-    
+        return bulk_upsert(hybrid=True)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -338,7 +774,7 @@ def query_hybrid_index():
                 "error": error
             }), 400
         
-        index = client.get_index(name=index_name)
+        index = index_cache.get(index_name)
         dimension = index.dimension
         if dimension != len(vector):
             return jsonify({
@@ -346,20 +782,10 @@ def query_hybrid_index():
             }), 400
         
         sparse_indices, sparse_values = data.get("sparse_indices"), data.get("sparse_values")
-        if not sparse_indices or not sparse_values:
-            return jsonify({
-                "error": "sparse_indices and sparse_values are required"
-            }), 400
-
-        if len(sparse_values) != len(sparse_indices):
-            return jsonify({
-                "error": f"Sparse Indices and Values should have the same length"
-            }), 400
-        
-        sparse_dimension = index.sparse_dim
-        if max(sparse_indices) >= sparse_dimension:
+        error = validate_sparse_vector(sparse_indices, sparse_values, index.sparse_dim)
+        if error:
             return jsonify({
-                "error": "Sparse index out of bounds"
+                "error": error
             }), 400
 
         top_k = data.get("top_k", 5)
@@ -375,30 +801,36 @@ def query_hybrid_index():
                 "error": "include_vectors must be a Boolean Value"
             }), 400
 
-        raw_results = index.query(
-            vector=vector,
-            sparse_indices=sparse_indices,
-            sparse_values=sparse_values,
-            top_k=top_k,
-            include_vectors=include_vectors
-        )
+        fields, error = select_fields(data, include_vectors)
+        if error:
+            return jsonify({
+                "error": error
+            }), 400
+
+        # "native" lets endee-db combine both parts, the other modes fuse here
+        options, error = read_fusion_options(data)
+        if error:
+            return jsonify({
+                "error": error
+            }), 400
 
-        # Normalize response
-        cleaned_results = [
-            {
-                "id": r.get("id"),
-                "similarity": r.get("similarity"),
-                "distance": r.get("distance"),
-                "text": r.get("meta", {}).get("text"),
-                "description": r.get("meta", {}).get("description", ""),
-                "title": r.get("meta").get("title", "")
-            }
-            for r in raw_results
-        ]
+        query = {
+            "vector": to_list(vector),
+            "sparse_indices": to_list(sparse_indices),
+            "sparse_values": to_list(sparse_values),
+            "top_k": top_k,
+            "include_vectors": "vector" in fields,
+            "fields": fields
+        }
+        if options["fusion"] == "native":
+            cleaned_results = cached_query(index_name, index, query)
+        else:
+            cleaned_results = fused_query(index_name, index, query, options)
 
         return jsonify({
             "index_name": index_name,
             "top_k": top_k,
+            "fusion": options,
             "results": cleaned_results
         })
     
@@ -406,6 +838,162 @@ def query_hybrid_index():
         return jsonify({"error": str(e)}), 500
 
 
+# Batch Query for HYBRID Index
+@app.route("/index/hybrid/query/batch", methods=["POST"])
+def query_hybrid_index_batch():
+    try:
+        return batch_query(hybrid=True)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Delete Vectors by ID (dense and hybrid indexes)
+@app.route("/index/delete", methods=["POST"])
+def delete_vectors():
+    try:
+        data, err_resp, err_status = get_json_or_error()
+        if err_resp is not None:
+            return err_resp, err_status
+
+        index_name = data.get("index_name")
+        ids = data.get("ids")
+        error = validate_index_name(index_name) or validate_ids(ids, MAX_MUTATION_BATCH)
+        if error:
+            return jsonify({
+                "error": error
+            }), 400
+
+        index = index_cache.get(index_name)
+        report = delete_ids(upsert_executor, index, ids, retries=UPSERT_RETRIES)
+        if report["deleted"]:
+            result_cache.bump_generation(index_name)
+
+        if not report["failed"]:
+            return jsonify({"status": "vectors deleted", **report})
+        return jsonify({"status": "vectors partially deleted", **report}), 207
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Delete Vectors by Metadata, e.g. every chunk of one source document
+@app.route("/index/delete/meta", methods=["POST"])
+def delete_vectors_by_meta():
+    try:
+        data, err_resp, err_status = get_json_or_error()
+        if err_resp is not None:
+            return err_resp, err_status
+
+        index_name = data.get("index_name")
+        # A single object is accepted as a batch of one
+        matches = data.get("match")
+        if isinstance(matches, dict):
+            matches = [matches]
+        error = (
+            validate_index_name(index_name)
+            or validate_metadata_matches(matches, FILTER_FIELDS, MAX_DELETE_MATCHES)
+        )
+        if error:
+            return jsonify({
+                "error": error
+            }), 400
+
+        index = index_cache.get(index_name)
+        report = delete_matching(index, matches, retries=UPSERT_RETRIES)
+        result_cache.bump_generation(index_name)
+
+        if not report["failed"]:
+            return jsonify({"status": "vectors deleted", **report})
+        return jsonify({"status": "vectors partially deleted", **report}), 207
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Update Metadata only (vectors are kept, nothing is re-embedded)
+@app.route("/index/update/meta", methods=["POST"])
+def update_vectors_meta():
+    try:
+        data, err_resp, err_status = get_json_or_error()
+        if err_resp is not None:
+            return err_resp, err_status
+
+        index_name = data.get("index_name")
+        updates = data.get("updates")
+        error = validate_index_name(index_name) or validate_meta_updates(updates, MAX_MUTATION_BATCH)
+        if error:
+            return jsonify({
+                "error": error
+            }), 400
+
+        index = index_cache.get(index_name)
+        precision = getattr(index.precision, "value", index.precision)
+        if str(precision).lower() in REQUANTIZED_PRECISIONS:
+            return jsonify({
+                "error": f"metadata updates re-upsert the stored vectors, which would be quantized again on a {precision} index; re-ingest the documents instead"
+            }), 400
+
+        report = update_metadata(
+            upsert_executor,
+            index,
+            updates,
+            slice_size=UPSERT_SLICE_SIZE,
+            max_in_flight=UPSERT_MAX_IN_FLIGHT,
+            retries=UPSERT_RETRIES,
+            filter_fields=FILTER_FIELDS
+        )
+        if report["updated"]:
+            result_cache.bump_generation(index_name)
+
+        if not report["failed"] and not report["failed_slices"]:
+            return jsonify({"status": "metadata updated", **report})
+        return jsonify({"status": "metadata partially updated", **report}), 207
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Index handle cache: hit/miss counters and explicit invalidation
+@app.route("/index/cache/stats", methods=["GET"])
+def index_cache_stats():
+    return jsonify(index_cache.stats())
+
+
+# Query result cache: hit rate, size and per-index generations
+@app.route("/index/query/cache/stats", methods=["GET"])
+def query_cache_stats():
+    return jsonify(result_cache.stats())
+
+
+@app.route("/index/cache/invalidate", methods=["POST"])
+def invalidate_index_cache():
+    try:
+        data = request.get_json(silent=True) or {}
+
+        # Without an index_name every cached handle is dropped
+        index_name = data.get("index_name")
+        if index_name is not None:
+            error = validate_index_name(index_name)
+            if error:
+                return jsonify({
+                    "error": error
+                }), 400
+
+        removed = index_cache.invalidate(index_name)
+        result_cache.bump_generation(index_name)
+        return jsonify({"status": "cache invalidated", "removed": removed})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# -----------------------------
+# Prometheus metrics of this worker
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 # -----------------------------
 # Run Server
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+"""
+Load benchmark for the endee-service routes.
+
+By default the Flask app is driven in-process against the local NumPy
+backend (ENDEE_DB_URL=local://), so the service layer can be measured
+without endee-db. Pass --url to benchmark a running service instead.
+
+    python benchmarks/bench_routes.py --mode hybrid --vectors 20000 --concurrency 16
+    python benchmarks/bench_routes.py --url http://localhost:8000 --queries 2000
+"""
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark endee-service routes")
+    parser.add_argument("--url", help="Base URL of a running service (default: in-process app)")
+    parser.add_argument("--mode", choices=["dense", "hybrid"], default="dense")
+    parser.add_argument("--index-name", default="bench_index")
+    parser.add_argument("--vectors", type=int, default=10000, help="Vectors upserted before querying")
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--sparse-dim", type=int, default=30522)
+    parser.add_argument("--sparse-terms", type=int, default=64, help="Non-zero terms per sparse vector")
+    parser.add_argument("--precision", default="int16d")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1, help="Queries per request (>1 uses the batch route)")
+    parser.add_argument("--skip-ingest", action="store_true", help="Reuse an existing index")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+class InProcessTransport:
+    def __init__(self):
+        os.environ.setdefault("ENDEE_DB_URL", "local://")
+        # Random queries never repeat; keep the result cache out of the numbers
+        os.environ.setdefault("QUERY_CACHE_SIZE", "0")
+        sys.path.insert(0, SERVICE_DIR)
+        import api
+        self._app = api.app
+        self._local = threading.local()
+
+    def post(self, path, payload):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        response = client.post(path, json=payload)
+        return response.status_code, response.get_json()
+
+
+class HttpTransport:
+    def __init__(self, base_url):
+        import requests
+        self._base_url = base_url.rstrip("/")
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=64)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def post(self, path, payload):
+        response = self._session.post(f"{self._base_url}{path}", json=payload, timeout=60)
+        return response.status_code, response.json()
+
+
+def random_sparse(rng, args):
+    indices = np.sort(rng.choice(args.sparse_dim, size=args.sparse_terms, replace=False))
+    values = rng.random(args.sparse_terms, dtype=np.float32)
+    return indices.tolist(), values.tolist()
+
+
+def make_query(rng, args):
+    query = {"vector": rng.standard_normal(args.dimension, dtype=np.float32).tolist(), "top_k": args.top_k}
+    if args.mode == "hybrid":
+        query["sparse_indices"], query["sparse_values"] = random_sparse(rng, args)
+    return query
+
+
+def ingest(transport, rng, args):
+    prefix = "/index/hybrid" if args.mode == "hybrid" else "/index"
+    create = {"index_name": args.index_name, "dimension": args.dimension, "precision": args.precision}
+    if args.mode == "hybrid":
+        create["sparse_dimension"] = args.sparse_dim
+    status, body = transport.post(f"{prefix}/create", create)
+    if status != 200:
+        print(f"create: {status} {body}")
+
+    started = time.perf_counter()
+    for start in range(0, args.vectors, 5000):
+        items = []
+        for i in range(start, min(start + 5000, args.vectors)):
+            item = {
+                "id": i,
+                "vector": rng.standard_normal(args.dimension, dtype=np.float32).tolist(),
+                "meta": {"title": f"doc {i}", "text": f"chunk {i}", "source": "bench"},
+            }
+            if args.mode == "hybrid":
+                item["sparse_indices"], item["sparse_values"] = random_sparse(rng, args)
+            items.append(item)
+        status, body = transport.post(f"{prefix}/upsert", {"index_name": args.index_name, "embedded_vectors": items})
+        if status != 200:
+            raise SystemExit(f"upsert failed: {status} {body}")
+    elapsed = time.perf_counter() - started
+    print(f"ingested {args.vectors} vectors in {elapsed:.2f}s ({args.vectors / elapsed:.0f} vectors/s)")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    rank = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def run(transport, rng, args):
+    prefix = "/index/hybrid" if args.mode == "hybrid" else "/index"
+    requests_count = max(1, args.queries // args.batch_size)
+    payloads = []
+    for _ in range(requests_count):
+        if args.batch_size > 1:
+            payloads.append(("query/batch", {
+                "index_name": args.index_name,
+                "queries": [make_query(rng, args) for _ in range(args.batch_size)],
+            }))
+        else:
+            payloads.append(("query", {"index_name": args.index_name, **make_query(rng, args)}))
+
+    def send(item):
+        route, payload = item
+        started = time.perf_counter()
+        status, _ = transport.post(f"{prefix}/{route}", payload)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(send, payloads))
+    wall = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status != 200)
+    print(f"requests: {len(results)} ({errors} errors), queries per request: {args.batch_size}, concurrency: {args.concurrency}")
+    print(f"latency ms  p50={percentile(latencies, 50) * 1000:.2f}  p95={percentile(latencies, 95) * 1000:.2f}  "
+          f"p99={percentile(latencies, 99) * 1000:.2f}  mean={statistics.fmean(latencies) * 1000:.2f}")
+    print(f"throughput  {len(results) / wall:.1f} req/s, {len(results) * args.batch_size / wall:.1f} queries/s")
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    transport = HttpTransport(args.url) if args.url else InProcessTransport()
+    if not args.skip_ingest:
+        ingest(transport, rng, args)
+    run(transport, rng, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import json
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+import httpx
+import requests
+from endee.exceptions import ServerException
+from wire_format import vectors_to_lists
+import metrics
+
+"""
+Server-side batching of upserts.
+
+endee-db accepts at most 1000 vectors per insert, so large payloads are cut
+into slices here and the slices are sent concurrently on a bounded executor,
+with retries on transient failures. The caller gets one aggregate report
+with the outcome of every slice.
+"""
+MAX_VECTORS_PER_BATCH = 1000
+# Worth another try: endee-db 5xx, dropped connections and timeouts
+# (the SDK talks to endee-db through requests or httpx)
+TRANSIENT_ERRORS = (
+    ServerException,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    httpx.TransportError,
+)
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/ndjson"}
+
+
+def is_ndjson_request(req):
+    return req.mimetype in NDJSON_CONTENT_TYPES
+
+
+def iter_slices(items, slice_size):
+    for start in range(0, len(items), slice_size):
+        yield start, items[start: start + slice_size]
+
+
+"""
+Reads NDJSON vectors (one JSON object per line, the header line already
+consumed) and yields (start, items, errors) slices as soon as they fill up,
+so the first slices are already on their way to endee-db while the rest
+of the body is still being read. validate(items) returns errors with
+positions relative to the slice.
+"""
+def iter_ndjson_slices(lines, slice_size, validate):
+    items, start, position = [], 0, 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(None)
+        position += 1
+        if len(items) == slice_size:
+            yield start, items, _offset_errors(validate(items), start)
+            items, start = [], position
+    if items:
+        yield start, items, _offset_errors(validate(items), start)
+
+
+def _offset_errors(errors, start):
+    return [{"position": e["position"] + start, "error": e["error"]} for e in errors]
+
+
+"""
+Runs call() against endee-db, retrying with exponential backoff on transient
+errors (TRANSIENT_ERRORS). Returns {"success", "attempts", "error", "result"}.
+Everything else (data rejected by the SDK, 4xx such as not found, forbidden
+or conflict) fails at once, sending it again would not help.
+"""
+def call_with_retries(operation, call, retries, backoff):
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            with metrics.time_db_call(operation):
+                result = call()
+            return {"success": True, "attempts": attempts, "error": None, "result": result}
+        except TRANSIENT_ERRORS as e:
+            if attempts > retries:
+                return {"success": False, "attempts": attempts, "error": str(e), "result": None}
+            time.sleep(backoff * 2 ** (attempts - 1))
+        except Exception as e:
+            return {"success": False, "attempts": attempts, "error": str(e), "result": None}
+
+
+"""
+Copies the configured meta keys (e.g. "source") into each vector's filter.
+endee-db can only delete by filter, so this is what makes the
+delete-by-metadata route work for vectors whose filter was not set.
+"""
+def with_filter_fields(items, filter_fields):
+    if not filter_fields:
+        return items
+    prepared = []
+    for item in items:
+        meta = item.get("meta") or {}
+        mirrored = {key: meta[key] for key in filter_fields if key in meta}
+        if mirrored:
+            item = {**item, "filter": {**mirrored, **(item.get("filter") or {})}}
+        prepared.append(item)
+    return prepared
+
+
+# Sends one slice, retrying with exponential backoff on transient errors
+def upsert_slice(index, items, retries, backoff, filter_fields=()):
+    items = vectors_to_lists(with_filter_fields(items, filter_fields))
+    outcome = call_with_retries("upsert", lambda: index.upsert(items), retries, backoff)
+    outcome.pop("result")
+    return outcome
+
+
+"""
+Dispatches (start, items, errors) slices on the executor with at most
+max_in_flight slices pending for this request, and builds the report.
+Slices that failed validation are reported without being sent.
+"""
+def upsert_slices(executor, index, slices, max_in_flight, retries=3, backoff=0.5, filter_fields=()):
+    started = time.perf_counter()
+    report, in_flight = [], set()
+
+    for number, (start, items, errors) in enumerate(slices):
+        entry = {"slice": number, "start": start, "count": len(items)}
+        report.append(entry)
+        if errors:
+            entry.update({"success": False, "attempts": 0, "error": "Invalid vectors in slice", "errors": errors})
+            continue
+
+        while len(in_flight) >= max_in_flight:
+            _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        future = executor.submit(upsert_slice, index, items, retries, backoff, filter_fields)
+        entry["future"] = future
+        in_flight.add(future)
+
+    for entry in report:
+        future = entry.pop("future", None)
+        if future is not None:
+            entry.update(future.result())
+
+    elapsed = time.perf_counter() - started
+    upserted = sum(e["count"] for e in report if e["success"])
+    return {
+        "count": upserted,
+        "total": sum(e["count"] for e in report),
+        "succeeded_slices": sum(1 for e in report if e["success"]),
+        "failed_slices": sum(1 for e in report if not e["success"]),
+        "elapsed_seconds": round(elapsed, 4),
+        "vectors_per_second": round(upserted / elapsed, 2) if elapsed > 0 else None,
+        "slices": report,
+    }
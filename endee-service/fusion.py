@@ -0,0 +1,65 @@
+"""
+Fusion of separate dense-only and sparse-only candidate lists for hybrid
+search. Both functions take the raw result lists returned by index.query
+(dicts with id, similarity, meta, vector) and return the top_k fused
+results in the same shape, with the fused score as "similarity".
+
+alpha is the weight of the dense side: 1.0 is pure dense, 0.0 pure sparse.
+"""
+FUSION_MODES = {"native", "weighted", "rrf"}
+
+
+def _merge(scores, candidates, top_k):
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    fused = []
+    for vector_id, score in ranked:
+        result = dict(candidates[vector_id])
+        result["similarity"] = score
+        result["distance"] = None
+        fused.append(result)
+    return fused
+
+
+def _collect(candidates, results):
+    for r in results:
+        candidates.setdefault(r.get("id"), r)
+
+
+# Min-max normalisation: sparse scores are unbounded dot products while the
+# dense ones are similarities, so they are brought to [0, 1] before mixing.
+def _normalized(results):
+    if not results:
+        return {}
+    values = [r.get("similarity") or 0.0 for r in results]
+    low, high = min(values), max(values)
+    span = high - low
+    return {
+        r.get("id"): (value - low) / span if span > 0 else 1.0
+        for r, value in zip(results, values)
+    }
+
+
+# Convex combination of the normalised dense and sparse scores
+def fuse_weighted(dense_results, sparse_results, alpha, top_k):
+    candidates = {}
+    _collect(candidates, dense_results)
+    _collect(candidates, sparse_results)
+
+    dense_scores = _normalized(dense_results)
+    sparse_scores = _normalized(sparse_results)
+    scores = {
+        vector_id: alpha * dense_scores.get(vector_id, 0.0) + (1 - alpha) * sparse_scores.get(vector_id, 0.0)
+        for vector_id in candidates
+    }
+    return _merge(scores, candidates, top_k)
+
+
+# Weighted reciprocal-rank fusion: only the ranks matter, not the raw scores
+def fuse_rrf(dense_results, sparse_results, alpha, top_k, rrf_k=60):
+    candidates, scores = {}, {}
+    for weight, results in ((alpha, dense_results), (1 - alpha, sparse_results)):
+        _collect(candidates, results)
+        for rank, r in enumerate(results, start=1):
+            vector_id = r.get("id")
+            scores[vector_id] = scores.get(vector_id, 0.0) + weight / (rrf_k + rank)
+    return _merge(scores, candidates, top_k)
@@ -0,0 +1,16 @@
+import os
+
+# Production server for api.py: `gunicorn -c gunicorn.conf.py api:app`
+# Each worker is a separate process with its own Endee connection pool,
+# and serves requests on a pool of threads (the DB calls release the GIL).
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# The local:// stand-in keeps its indexes inside the process, so every extra
+# worker would serve its own, diverging copy of the data
+if os.getenv("ENDEE_DB_URL", "").startswith("local://"):
+    workers = 1
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+accesslog = "-"
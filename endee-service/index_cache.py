@@ -0,0 +1,75 @@
+import threading
+import time
+
+"""
+Thread-safe cache of Endee index handles and their metadata.
+
+Every route used to call client.get_index() before doing the real work, which
+costs a round trip to endee-db just to read things like the dimension or the
+sparse_dim of the index. Handles are now kept here for `ttl` seconds, filled
+when an index is created and dropped explicitly through invalidate().
+"""
+class IndexCache:
+    def __init__(self, loader, ttl=300):
+        # loader(name) -> Index, called on a miss or when an entry has expired
+        self._loader = loader
+        self._ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._loads = 0
+
+    # Returns the cached handle, loading it from endee-db on a miss
+    def get(self, name):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry["expires_at"] > now:
+                self._hits += 1
+                return entry["index"]
+            self._misses += 1
+
+        # Load outside the lock so a slow DB call does not block other indexes
+        index = self._loader(name)
+        self.put(name, index)
+        return index
+
+    # Stores a handle, e.g. right after /index/create
+    def put(self, name, index):
+        entry = {
+            "index": index,
+            "meta": {
+                "dimension": getattr(index, "dimension", None),
+                "sparse_dim": getattr(index, "sparse_dim", 0),
+                "space_type": getattr(index, "space_type", None),
+                "precision": getattr(index, "precision", None),
+            },
+            "expires_at": time.monotonic() + self._ttl,
+        }
+        with self._lock:
+            self._entries[name] = entry
+            self._loads += 1
+
+    # Drops one index, or every index when name is None
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            return 1 if self._entries.pop(name, None) is not None else 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "loads": self._loads,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "indexes": {
+                    name: entry["meta"] for name, entry in self._entries.items()
+                },
+                "ttl_seconds": self._ttl,
+            }
@@ -0,0 +1,310 @@
+import copy
+import threading
+import numpy as np
+from endee.exceptions import ConflictException, NotFoundException
+
+"""
+In-process stand-in for endee-db, selected with ENDEE_DB_URL=local://
+
+It exposes the same surface the service uses from the Endee SDK
+(create_index / get_index and Index.upsert / query / get_vector /
+delete_vector / delete_with_filter / describe)
+but keeps everything in NumPy arrays and answers with an exact
+(brute-force) search. Dense, sparse and dense+sparse hybrid queries are
+supported, and vectors go through the same precision loss as the
+configured precision. It is meant for development and benchmarking the
+service layer on machines that cannot build endee-db, not for production.
+"""
+MAX_VECTORS_PER_BATCH = 1000
+MAX_TOP_K = 512
+PRECISIONS = {"binary", "float16", "float32", "int16d", "int8d"}
+
+
+# Applies the rounding of the storage precision and returns float32 again
+def apply_precision(vectors, precision):
+    if precision == "float32":
+        return vectors
+    if precision == "float16":
+        return vectors.astype(np.float16).astype(np.float32)
+    if precision == "binary":
+        return np.where(vectors >= 0, 1.0, -1.0).astype(np.float32)
+
+    levels = 127 if precision == "int8d" else 32767
+    scale = np.abs(vectors).max(axis=1, keepdims=True)
+    np.maximum(scale, 1e-10, out=scale)
+    quantized = np.round(vectors / scale * levels)
+    return (quantized * scale / levels).astype(np.float32)
+
+
+def _precision_name(precision):
+    return getattr(precision, "value", precision).lower()
+
+
+class LocalIndex:
+    def __init__(self, name, dimension, space_type, precision, sparse_dim, M):
+        self.name = name
+        self.dimension = dimension
+        self.space_type = space_type
+        self.precision = precision
+        self.sparse_dim = sparse_dim
+        self.M = M
+        self._lock = threading.RLock()
+        self._ids = []
+        self._rows = {}
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._meta = []
+        self._filters = []
+        self._sparse = []
+        self._sparse_matrix = None
+
+    @property
+    def count(self):
+        return len(self._ids)
+
+    @property
+    def is_hybrid(self):
+        return self.sparse_dim > 0
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "space_type": self.space_type,
+            "dimension": self.dimension,
+            "sparse_dim": self.sparse_dim,
+            "is_hybrid": self.is_hybrid,
+            "count": self.count,
+            "precision": self.precision,
+            "M": self.M,
+        }
+
+    def _prepare_dense(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected shape (N, {self.dimension}), got {vectors.shape}")
+        if not np.isfinite(vectors).all():
+            raise ValueError("Vectors contain NaN or infinity")
+        norms = np.sqrt(np.einsum("ij,ij->i", vectors, vectors))
+        if self.space_type == "cosine":
+            vectors = vectors / np.maximum(norms, 1e-10)[:, None]
+        return apply_precision(vectors, self.precision), norms
+
+    def upsert(self, input_array):
+        if len(input_array) > MAX_VECTORS_PER_BATCH:
+            raise ValueError(f"Cannot insert more than {MAX_VECTORS_PER_BATCH} vectors at a time")
+
+        ids = [str(item["id"]) for item in input_array]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate IDs found in input array")
+
+        sparse = []
+        for item in input_array:
+            has_sparse = item.get("sparse_indices") is not None
+            if has_sparse != self.is_hybrid:
+                raise ValueError(
+                    "Hybrid index requires sparse data(along with dense vectors), "
+                    "and dense-only index forbids it."
+                )
+            if has_sparse:
+                indices = np.asarray(item["sparse_indices"], dtype=np.int64)
+                values = np.asarray(item["sparse_values"], dtype=np.float32)
+                if len(indices) != len(values):
+                    raise ValueError("sparse_indices and sparse_values must match in length")
+                if len(indices) and (indices.min() < 0 or indices.max() >= self.sparse_dim):
+                    raise ValueError(f"Sparse indices out of bounds [0, {self.sparse_dim})")
+                sparse.append((indices, values))
+            else:
+                sparse.append(None)
+
+        vectors, norms = self._prepare_dense([item["vector"] for item in input_array])
+
+        with self._lock:
+            new_rows = []
+            for i, vector_id in enumerate(ids):
+                item = input_array[i]
+                row = self._rows.get(vector_id)
+                if row is None:
+                    new_rows.append(i)
+                    self._rows[vector_id] = len(self._ids)
+                    self._ids.append(vector_id)
+                    self._meta.append(copy.deepcopy(item.get("meta") or {}))
+                    self._filters.append(copy.deepcopy(item.get("filter") or {}))
+                    self._sparse.append(sparse[i])
+                else:
+                    self._vectors[row] = vectors[i]
+                    self._norms[row] = norms[i]
+                    self._meta[row] = copy.deepcopy(item.get("meta") or {})
+                    self._filters[row] = copy.deepcopy(item.get("filter") or {})
+                    self._sparse[row] = sparse[i]
+            if new_rows:
+                self._vectors = np.concatenate([self._vectors, vectors[new_rows]])
+                self._norms = np.concatenate([self._norms, norms[new_rows]])
+            self._sparse_matrix = None
+
+        return "Vectors inserted successfully"
+
+    # Flattened (row, index, value) view of the sparse vectors, rebuilt lazily
+    def _sparse_entries(self):
+        if self._sparse_matrix is None:
+            pairs = [(row, s) for row, s in enumerate(self._sparse) if s is not None and len(s[0])]
+            if pairs:
+                rows = np.concatenate([np.full(len(s[0]), row, dtype=np.int64) for row, s in pairs])
+                indices = np.concatenate([s[0] for _, s in pairs])
+                values = np.concatenate([s[1] for _, s in pairs])
+            else:
+                rows = indices = np.empty(0, dtype=np.int64)
+                values = np.empty(0, dtype=np.float32)
+            self._sparse_matrix = (rows, indices, values)
+        return self._sparse_matrix
+
+    def _dense_scores(self, vector):
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (self.dimension,):
+            raise ValueError(f"Vector must have shape ({self.dimension},), got {query.shape}")
+        if self.space_type == "cosine":
+            query = query / max(float(np.sqrt(query @ query)), 1e-10)
+            return self._vectors @ query
+        if self.space_type == "l2":
+            diff = self._vectors - query
+            return 1.0 - np.einsum("ij,ij->i", diff, diff)
+        return self._vectors @ query
+
+    def _sparse_scores(self, sparse_indices, sparse_values):
+        weights = np.zeros(self.sparse_dim, dtype=np.float32)
+        np.add.at(weights, np.asarray(sparse_indices, dtype=np.int64), np.asarray(sparse_values, dtype=np.float32))
+        rows, indices, values = self._sparse_entries()
+        return np.bincount(rows, weights=weights[indices] * values, minlength=self.count).astype(np.float32)
+
+    def query(self, vector=None, top_k=10, filter=None, ef=128, include_vectors=False,
+              log=False, sparse_indices=None, sparse_values=None):
+        if filter:
+            raise ValueError("Filtered queries are not supported by the local backend")
+        if not 0 < top_k <= MAX_TOP_K:
+            raise ValueError(f"top_k must be between 1 and {MAX_TOP_K}")
+        has_sparse = sparse_indices is not None
+        if vector is None and not has_sparse:
+            raise ValueError("At least one of 'vector' or 'sparse_indices'/'sparse_values' must be provided.")
+        if has_sparse and not self.is_hybrid:
+            raise ValueError("Cannot perform sparse search on a dense-only index.")
+
+        with self._lock:
+            if not self.count:
+                return []
+            scores = np.zeros(self.count, dtype=np.float32)
+            if vector is not None:
+                scores += self._dense_scores(vector)
+            if has_sparse:
+                scores += self._sparse_scores(sparse_indices, sparse_values)
+
+            k = min(top_k, self.count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+
+            return [
+                {
+                    "id": self._ids[row],
+                    "similarity": float(scores[row]),
+                    "distance": 1.0 - float(scores[row]),
+                    "meta": copy.deepcopy(self._meta[row]),
+                    "norm": float(self._norms[row]),
+                    "vector": self._vectors[row].tolist() if include_vectors else [],
+                }
+                for row in top
+            ]
+
+    def get_vector(self, id):
+        with self._lock:
+            row = self._rows.get(str(id))
+            if row is None:
+                raise NotFoundException(f"Vector {id} not found")
+            result = {
+                "id": self._ids[row],
+                "meta": copy.deepcopy(self._meta[row]),
+                "filter": copy.deepcopy(self._filters[row]),
+                "norm": float(self._norms[row]),
+                "vector": self._vectors[row].tolist(),
+            }
+            if self._sparse[row] is not None:
+                result["sparse_indices"] = self._sparse[row][0].tolist()
+                result["sparse_values"] = self._sparse[row][1].tolist()
+            return result
+
+    # Drops rows and renumbers the ones after them
+    def _remove_rows(self, rows):
+        keep = np.ones(self.count, dtype=bool)
+        keep[list(rows)] = False
+        self._ids = [vector_id for vector_id, kept in zip(self._ids, keep) if kept]
+        self._meta = [m for m, kept in zip(self._meta, keep) if kept]
+        self._filters = [f for f, kept in zip(self._filters, keep) if kept]
+        self._sparse = [s for s, kept in zip(self._sparse, keep) if kept]
+        self._vectors = self._vectors[keep]
+        self._norms = self._norms[keep]
+        self._rows = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._sparse_matrix = None
+
+    def delete_vector(self, id):
+        with self._lock:
+            row = self._rows.get(str(id))
+            if row is None:
+                return "0 rows deleted"
+            self._remove_rows([row])
+        return "1 rows deleted"
+
+    # Supports the $eq and $in operators of the endee filter format
+    def delete_with_filter(self, filter):
+        def matches(values):
+            for condition in filter:
+                for field, ops in condition.items():
+                    if field not in values:
+                        return False
+                    for op, expected in ops.items():
+                        if op == "$eq" and values[field] != expected:
+                            return False
+                        if op == "$in" and values[field] not in expected:
+                            return False
+                        if op not in ("$eq", "$in"):
+                            raise ValueError(f"Filter operator {op} is not supported by the local backend")
+            return True
+
+        with self._lock:
+            rows = [row for row, values in enumerate(self._filters) if matches(values)]
+            if rows:
+                self._remove_rows(rows)
+        return f"{len(rows)} rows deleted"
+
+
+class LocalEndee:
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def create_index(self, name, dimension, space_type, M=16, ef_con=128,
+                     precision="int8d", version=None, sparse_dim=0):
+        precision = _precision_name(precision)
+        if precision not in PRECISIONS:
+            raise ValueError(f"Invalid precision: {precision}. Must be one of {sorted(PRECISIONS)}")
+        space_type = space_type.lower()
+        if space_type not in {"cosine", "l2", "ip"}:
+            raise ValueError(f"Invalid space type: {space_type}")
+        with self._lock:
+            if name in self._indexes:
+                raise ConflictException(f"Index {name} already exists")
+            self._indexes[name] = LocalIndex(name, dimension, space_type, precision, sparse_dim or 0, M)
+        return "Index created successfully"
+
+    def get_index(self, name):
+        with self._lock:
+            index = self._indexes.get(name)
+        if index is None:
+            raise NotFoundException(f"Index {name} not found")
+        return index
+
+    def list_indexes(self):
+        with self._lock:
+            return [index.describe() for index in self._indexes.values()]
+
+    def delete_index(self, name):
+        with self._lock:
+            if self._indexes.pop(name, None) is None:
+                raise NotFoundException(f"Index {name} not found")
+        return f"Index {name} deleted successfully"
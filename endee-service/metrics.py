@@ -0,0 +1,220 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+"""
+Minimal Prometheus metrics for endee-service (text exposition format).
+
+Metrics are kept per worker process in the module-level registry below and
+rendered by the /metrics route. Only counters, gauges and histograms are
+needed here, so this avoids pulling in an extra client library.
+"""
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+# Label values escape backslash, double quote and line feed, as the exposition format requires
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(label_names, label_values):
+    if not label_names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape_label_value(value)}"'
+        for name, value in zip(label_names, label_values)
+    )
+    return "{" + pairs + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self):
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def _render_samples(self):
+        lines = []
+        names = self.label_names + ("le",)
+        for key, entry in self._values.items():
+            for bound, count in zip(self.buckets, entry["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (bound,))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {entry['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {entry['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {entry['count']}")
+        return lines
+
+
+# -----------------------------
+# Metrics exposed by the service
+REQUESTS = Counter(
+    "endee_service_requests_total",
+    "HTTP requests handled, by route and status code",
+    ("route", "method", "status")
+)
+REQUEST_LATENCY = Histogram(
+    "endee_service_request_duration_seconds",
+    "End-to-end request latency per route",
+    ("route",)
+)
+STAGE_LATENCY = Histogram(
+    "endee_service_stage_duration_seconds",
+    "Time spent in request parsing, validation and response serialization",
+    ("stage",)
+)
+DB_LATENCY = Histogram(
+    "endee_service_db_call_duration_seconds",
+    "Latency of calls to endee-db, by operation",
+    ("operation", "outcome")
+)
+REQUEST_BYTES = Histogram(
+    "endee_service_request_bytes",
+    "Request body size per route",
+    ("route",),
+    buckets=SIZE_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    "endee_service_response_bytes",
+    "Response body size per route",
+    ("route",),
+    buckets=SIZE_BUCKETS
+)
+VECTORS_UPSERTED = Counter(
+    "endee_service_vectors_upserted_total",
+    "Vectors successfully upserted into endee-db",
+    ("route",)
+)
+UPSERT_THROUGHPUT = Gauge(
+    "endee_service_upsert_vectors_per_second",
+    "Vectors per second of the last upsert request",
+    ("route",)
+)
+
+REGISTRY = [
+    REQUESTS,
+    REQUEST_LATENCY,
+    STAGE_LATENCY,
+    DB_LATENCY,
+    REQUEST_BYTES,
+    RESPONSE_BYTES,
+    VECTORS_UPSERTED,
+    UPSERT_THROUGHPUT,
+]
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def time_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage=stage)
+
+
+# Wraps a function so every call is recorded as `stage`
+def timed_stage(stage):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with time_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def time_db_call(operation):
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        DB_LATENCY.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
+
+
+# Hooks recording count, latency and payload sizes of every request
+def init_app(app):
+    from flask import request, g
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        started = g.pop("request_started", None)
+        if started is not None:
+            REQUEST_LATENCY.observe(time.perf_counter() - started, route=route)
+        REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        if request.content_length:
+            REQUEST_BYTES.observe(request.content_length, route=route)
+        if response.content_length is not None:
+            RESPONSE_BYTES.observe(response.content_length, route=route)
+        return response
@@ -0,0 +1,183 @@
+import json
+import time
+from endee.exceptions import NotFoundException
+from bulk_upsert import call_with_retries, iter_slices, upsert_slices
+
+# Integer precisions: a vector read back from them is already dequantized, and
+# quantizing it again on the re-upsert of a metadata update can shift it
+REQUANTIZED_PRECISIONS = {"int8d", "int16d"}
+
+"""
+Batched deletes and metadata-only updates.
+
+They let a changed document be re-ingested by replacing only its own
+chunks instead of rebuilding the whole index. Deletes by metadata go through
+the vector filter, which is why upserts mirror FILTER_FIELDS of the meta
+into it (see bulk_upsert.with_filter_fields).
+"""
+
+
+# {"source": "a.pdf"} -> [{"source": {"$eq": "a.pdf"}}], list values use $in
+def to_endee_filter(match):
+    return [
+        {field: {"$in": value} if isinstance(value, list) else {"$eq": value}}
+        for field, value in match.items()
+    ]
+
+
+# The SDK answers deletes with "<n> rows deleted"; None when the text is anything else
+def _deleted_count(message):
+    try:
+        return int(str(message).split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def _delete_one(index, vector_id):
+    try:
+        return index.delete_vector(vector_id)
+    except NotFoundException:
+        return "0 rows deleted"
+
+
+def _get_one(index, vector_id):
+    try:
+        return index.get_vector(vector_id)
+    except NotFoundException:
+        return None
+
+
+# Deletes the ids concurrently on the executor and reports the ones that were missing or failed.
+# endee-db has no batched delete by id: every id is its own delete_vector call.
+def delete_ids(executor, index, ids, retries=3, backoff=0.5):
+    started = time.perf_counter()
+    futures = [
+        (vector_id, executor.submit(
+            call_with_retries, "delete", lambda v=str(vector_id): _delete_one(index, v), retries, backoff
+        ))
+        for vector_id in ids
+    ]
+
+    deleted, not_found, failed = 0, [], []
+    for vector_id, future in futures:
+        outcome = future.result()
+        if not outcome["success"]:
+            failed.append({"id": vector_id, "error": outcome["error"]})
+        elif _deleted_count(outcome["result"]) == 0:
+            not_found.append(vector_id)
+        else:
+            deleted += 1
+
+    return {
+        "deleted": deleted,
+        "not_found": not_found,
+        "failed": failed,
+        "elapsed_seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+"""
+One filtered delete per match object, reported in the same order. "deleted"
+is null for a match whose response did not carry a row count, and the total
+is null as soon as one of them is unknown.
+"""
+def delete_matching(index, matches, retries=3, backoff=0.5):
+    started = time.perf_counter()
+    report = []
+    for match in matches:
+        endee_filter = to_endee_filter(match)
+        outcome = call_with_retries(
+            "delete_with_filter", lambda: index.delete_with_filter(endee_filter), retries, backoff
+        )
+        report.append({
+            "match": match,
+            "success": outcome["success"],
+            "deleted": _deleted_count(outcome["result"]) if outcome["success"] else 0,
+            "error": outcome["error"],
+        })
+
+    counts = [entry["deleted"] for entry in report]
+    return {
+        "deleted": None if None in counts else sum(counts),
+        "failed": sum(1 for entry in report if not entry["success"]),
+        "elapsed_seconds": round(time.perf_counter() - started, 4),
+        "matches": report,
+    }
+
+
+def _stored_filter(stored):
+    value = stored.get("filter") or {}
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = {}
+    return value if isinstance(value, dict) else {}
+
+
+# Merges the new meta into the stored one; a null value removes the key
+def _merged_item(stored, meta, is_hybrid, filter_fields):
+    merged = dict(stored.get("meta") or {})
+    for key, value in meta.items():
+        if value is None:
+            merged.pop(key, None)
+        else:
+            merged[key] = value
+
+    item_filter = _stored_filter(stored)
+    for key in filter_fields:
+        if key in merged:
+            item_filter[key] = merged[key]
+        else:
+            item_filter.pop(key, None)
+
+    item = {"id": stored["id"], "vector": stored["vector"], "meta": merged, "filter": item_filter}
+    if is_hybrid:
+        item["sparse_indices"] = stored.get("sparse_indices") or []
+        item["sparse_values"] = stored.get("sparse_values") or []
+    return item
+
+
+"""
+Metadata-only update: each vector is read back (dense and sparse parts
+included), its meta merged with the update and the whole vector upserted
+again in slices, so nothing has to be re-embedded. The route refuses
+indexes with a REQUANTIZED_PRECISIONS precision.
+"""
+def update_metadata(executor, index, updates, slice_size, max_in_flight,
+                    retries=3, backoff=0.5, filter_fields=()):
+    started = time.perf_counter()
+    futures = [
+        (update, executor.submit(
+            call_with_retries, "get_vector", lambda v=str(update["id"]): _get_one(index, v), retries, backoff
+        ))
+        for update in updates
+    ]
+
+    items, not_found, failed = [], [], []
+    for update, future in futures:
+        outcome = future.result()
+        if not outcome["success"]:
+            failed.append({"id": update["id"], "error": outcome["error"]})
+        elif outcome["result"] is None:
+            not_found.append(update["id"])
+        else:
+            items.append(_merged_item(outcome["result"], update["meta"], index.is_hybrid, filter_fields))
+
+    upsert_report = upsert_slices(
+        executor,
+        index,
+        ((start, chunk, None) for start, chunk in iter_slices(items, slice_size)),
+        max_in_flight=max_in_flight,
+        retries=retries,
+        backoff=backoff
+    )
+
+    return {
+        "updated": upsert_report["count"],
+        "not_found": not_found,
+        "failed": failed,
+        "failed_slices": upsert_report["failed_slices"],
+        "elapsed_seconds": round(time.perf_counter() - started, 4),
+        "slices": upsert_report["slices"],
+    }
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: bumps are not locked across processes
+    fcntl = None
+
+"""
+In-process LRU cache of query results.
+
+Keys are built from the index name, a hash of the quantized query vector,
+the sparse terms, top_k, include_vectors, the projected fields and any
+extra options (e.g. hybrid fusion settings). Every index also has a
+generation counter that is part of the key: an upsert bumps it, so the
+results cached for the older contents of that index are never served again
+and simply age out of the LRU.
+
+With generation_dir the counters are kept in small files in that directory
+instead of in the process, so an upsert handled by one gunicorn worker
+invalidates the cached results of every worker sharing the directory. The
+files are re-read at most every generation_check_interval seconds; a bump
+made by this process is seen at once, one made by another worker within
+that interval.
+"""
+class QueryResultCache:
+    def __init__(self, max_entries=1024, ttl=300, quantum=1e-4, generation_dir=None,
+                 generation_check_interval=0.1):
+        self._max_entries = max_entries
+        self._generation_dir = generation_dir
+        self._generation_check_interval = generation_check_interval
+        self._counters = {}
+        if generation_dir:
+            os.makedirs(generation_dir, exist_ok=True)
+        self._ttl = ttl
+        self._quantum = quantum
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def enabled(self):
+        return self._max_entries > 0
+
+    # Rounds the floats so that tiny encoder noise still maps to the same key
+    def _digest(self, *arrays):
+        h = hashlib.blake2b(digest_size=16)
+        for arr in arrays:
+            h.update(arr.tobytes())
+            h.update(b"|")
+        return h.hexdigest()
+
+    def _quantize(self, values):
+        return np.round(np.asarray(values, dtype=np.float32) / self._quantum).astype(np.int64)
+
+    def _generation_path(self, index_name):
+        name = "_all" if index_name is None else hashlib.sha1(index_name.encode("utf-8")).hexdigest()
+        return os.path.join(self._generation_dir, f"{name}.gen")
+
+    @staticmethod
+    def _read_counter(path):
+        try:
+            with open(path, "rb") as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    # Counter file value, re-read only once the last read is older than the check interval
+    def _counter(self, path):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counters.get(path)
+        if cached is not None and now - cached[1] < self._generation_check_interval:
+            return cached[0]
+        value = self._read_counter(path)
+        with self._lock:
+            self._counters[path] = (value, now)
+        return value
+
+    # Increments the counter file under an exclusive lock, so concurrent bumps are not lost
+    def _bump_counter(self, path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            value = int(os.read(fd, 32) or 0) + 1
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, str(value).encode("ascii"))
+        finally:
+            os.close(fd)
+        with self._lock:
+            self._counters[path] = (value, time.monotonic())
+        return value
+
+    # Current generation of an index; shared counters also include the "all indexes" one
+    def _generation(self, index_name):
+        if not self._generation_dir:
+            with self._lock:
+                return self._generations.get(index_name, 0)
+        if not self.enabled:
+            return 0
+        generation = (
+            self._counter(self._generation_path(None)),
+            self._counter(self._generation_path(index_name))
+        )
+        with self._lock:
+            self._generations[index_name] = generation
+        return generation
+
+    def make_key(self, index_name, vector, top_k, include_vectors,
+                 sparse_indices=None, sparse_values=None, fields=None, options=None):
+        parts = [self._quantize(vector)]
+        if sparse_indices is not None:
+            parts.append(np.asarray(sparse_indices, dtype=np.int64))
+            parts.append(self._quantize(sparse_values))
+        generation = self._generation(index_name)
+        return (index_name, generation, self._digest(*parts), top_k, include_vectors, fields, options)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, results):
+        if not self.enabled:
+            return
+        # The index was written to while this query was running
+        if key[1] != self._generation(key[0]):
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    # Called after every upsert; name=None invalidates every index
+    def bump_generation(self, index_name=None):
+        if self._generation_dir:
+            self._bump_counter(self._generation_path(index_name))
+            with self._lock:
+                if index_name is None:
+                    self._entries.clear()
+            return
+        with self._lock:
+            if index_name is None:
+                for name in self._generations:
+                    self._generations[name] += 1
+                self._entries.clear()
+                return
+            self._generations[index_name] = self._generations.get(index_name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "ttl_seconds": self._ttl,
+                "generations": dict(self._generations),
+                "shared_generations": bool(self._generation_dir),
+            }
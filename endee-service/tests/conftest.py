@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The service modules are imported as top-level modules, as gunicorn does
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
@@ -0,0 +1,157 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from endee.exceptions import ForbiddenException, NotFoundException, ServerException
+from mutations import delete_ids, delete_matching, update_metadata
+
+# The routes run against the in-process stand-in for endee-db
+os.environ.setdefault("ENDEE_DB_URL", "local://")
+os.environ.setdefault("QUERY_CACHE_GENERATION_DIR", tempfile.mkdtemp(prefix="endee-service-tests-"))
+import api  # noqa: E402
+
+
+class FakeIndex:
+    is_hybrid = False
+    precision = "float32"
+
+    def __init__(self, stored=None, errors=None, filter_responses=None):
+        self.stored = dict(stored or {})
+        self.errors = dict(errors or {})
+        self.filter_responses = list(filter_responses or [])
+        self.calls = {}
+        self.upserted = []
+
+    def _call(self, vector_id):
+        self.calls[vector_id] = self.calls.get(vector_id, 0) + 1
+        if vector_id in self.errors:
+            raise self.errors[vector_id]
+        if vector_id not in self.stored:
+            raise NotFoundException("vector not found")
+
+    def delete_vector(self, vector_id):
+        self._call(vector_id)
+        del self.stored[vector_id]
+        return "1 rows deleted"
+
+    def get_vector(self, vector_id):
+        self._call(vector_id)
+        return self.stored[vector_id]
+
+    def delete_with_filter(self, endee_filter):
+        return self.filter_responses.pop(0)
+
+    def upsert(self, items):
+        self.upserted.extend(items)
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def stored_vector(vector_id, meta):
+    return {"id": vector_id, "vector": [0.1, 0.2], "meta": meta, "filter": "{}"}
+
+
+def test_delete_ids_reports_missing_and_failed_ids(executor):
+    index = FakeIndex(
+        stored={"a": {}, "b": {}, "busy": {}, "locked": {}},
+        errors={"busy": ServerException("unavailable"), "locked": ForbiddenException("forbidden")},
+    )
+    report = delete_ids(executor, index, ["a", "b", "gone", "busy", "locked"], retries=2, backoff=0)
+
+    assert report["deleted"] == 2
+    assert report["not_found"] == ["gone"]
+    assert [f["id"] for f in report["failed"]] == ["busy", "locked"]
+    # Transient errors are retried, the others fail at once
+    assert index.calls["busy"] == 3
+    assert index.calls["locked"] == 1
+
+
+def test_delete_matching_keeps_unknown_counts_null():
+    index = FakeIndex(filter_responses=["3 rows deleted", "done"])
+    report = delete_matching(index, [{"source": "a.pdf"}, {"source": "b.pdf"}], retries=0, backoff=0)
+
+    assert [m["deleted"] for m in report["matches"]] == [3, None]
+    assert report["deleted"] is None
+    assert report["failed"] == 0
+
+
+def test_update_metadata_merges_meta_and_filter_fields(executor):
+    index = FakeIndex(stored={"a": stored_vector("a", {"source": "old.pdf", "title": "Old", "draft": True})})
+    updates = [
+        {"id": "a", "meta": {"source": "new.pdf", "draft": None}},
+        {"id": "missing", "meta": {"title": "x"}},
+    ]
+    report = update_metadata(executor, index, updates, slice_size=100, max_in_flight=2,
+                             retries=0, backoff=0, filter_fields=("source",))
+
+    assert report["updated"] == 1
+    assert report["not_found"] == ["missing"]
+    assert index.upserted[0]["meta"] == {"source": "new.pdf", "title": "Old"}
+    assert index.upserted[0]["filter"] == {"source": "new.pdf"}
+
+
+@pytest.fixture
+def client():
+    api.app.config["TESTING"] = True
+    return api.app.test_client()
+
+
+def create_index(client, name, precision="float32"):
+    response = client.post("/index/create", json={"index_name": name, "dimension": 2, "precision": precision})
+    assert response.status_code in (200, 201), response.get_json()
+    vectors = [
+        {"id": str(i), "vector": [1.0, float(i)], "meta": {"source": f"{i % 2}.pdf"}}
+        for i in range(4)
+    ]
+    response = client.post("/index/upsert", json={"index_name": name, "embedded_vectors": vectors})
+    assert response.status_code == 200, response.get_json()
+    return api.index_cache.get(name)
+
+
+def test_delete_route_answers_207_on_partial_failure(client, monkeypatch):
+    index = create_index(client, "mutations_partial")
+    delete_vector = index.delete_vector
+
+    def failing_delete(vector_id):
+        if vector_id == "1":
+            raise ForbiddenException("forbidden")
+        return delete_vector(vector_id)
+
+    monkeypatch.setattr(index, "delete_vector", failing_delete)
+    response = client.post("/index/delete", json={"index_name": "mutations_partial", "ids": ["0", "1", "9"]})
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert body["status"] == "vectors partially deleted"
+    assert body["deleted"] == 1
+    assert body["not_found"] == ["9"]
+    assert [f["id"] for f in body["failed"]] == ["1"]
+
+
+def test_delete_route_answers_200_when_nothing_failed(client):
+    create_index(client, "mutations_complete")
+    response = client.post("/index/delete", json={"index_name": "mutations_complete", "ids": ["0", "9"]})
+
+    assert response.status_code == 200
+    assert response.get_json()["not_found"] == ["9"]
+
+
+def test_delete_by_meta_route(client):
+    create_index(client, "mutations_meta")
+    response = client.post("/index/delete/meta", json={"index_name": "mutations_meta", "match": {"source": "0.pdf"}})
+
+    assert response.status_code == 200
+    assert response.get_json()["deleted"] == 2
+
+
+def test_update_meta_route_refuses_integer_precisions(client):
+    create_index(client, "mutations_int8", precision="int8d")
+    response = client.post("/index/update/meta", json={
+        "index_name": "mutations_int8", "updates": [{"id": "0", "meta": {"title": "x"}}]
+    })
+
+    assert response.status_code == 400
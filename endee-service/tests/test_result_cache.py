@@ -0,0 +1,82 @@
+from result_cache import QueryResultCache
+
+VECTOR = [0.1, 0.2, 0.3]
+
+
+def key(cache, index_name="docs", vector=VECTOR):
+    return cache.make_key(index_name, vector, top_k=5, include_vectors=False)
+
+
+def test_hit_after_put_and_tiny_noise_maps_to_the_same_key():
+    cache = QueryResultCache()
+    cache.put(key(cache), ["result"])
+    assert cache.get(key(cache, vector=[0.1 + 1e-6, 0.2, 0.3])) == ["result"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_bump_invalidates_only_that_index():
+    cache = QueryResultCache()
+    cache.put(key(cache, "docs"), ["docs"])
+    cache.put(key(cache, "other"), ["other"])
+
+    cache.bump_generation("docs")
+    assert cache.get(key(cache, "docs")) is None
+    assert cache.get(key(cache, "other")) == ["other"]
+
+
+def test_bump_of_every_index():
+    cache = QueryResultCache()
+    cache.put(key(cache, "docs"), ["docs"])
+    cache.bump_generation()
+    assert cache.get(key(cache, "docs")) is None
+
+
+def test_results_of_a_query_overtaken_by_a_write_are_not_stored():
+    cache = QueryResultCache()
+    stale = key(cache)
+    cache.bump_generation("docs")
+    cache.put(stale, ["stale"])
+    assert cache.get(stale) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_shared_generations_invalidate_other_workers(tmp_path):
+    worker_a = QueryResultCache(generation_dir=str(tmp_path), generation_check_interval=0)
+    worker_b = QueryResultCache(generation_dir=str(tmp_path), generation_check_interval=0)
+    worker_a.put(key(worker_a), ["result"])
+    assert worker_a.get(key(worker_a)) == ["result"]
+
+    worker_b.bump_generation("docs")
+    assert worker_a.get(key(worker_a)) is None
+
+    worker_a.put(key(worker_a), ["fresh"])
+    worker_b.bump_generation()
+    assert worker_a.get(key(worker_a)) is None
+
+
+def test_shared_generations_are_rechecked_after_the_interval(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("result_cache.time.monotonic", lambda: now[0])
+    worker_a = QueryResultCache(generation_dir=str(tmp_path), generation_check_interval=0.1)
+    worker_b = QueryResultCache(generation_dir=str(tmp_path), generation_check_interval=0.1)
+    worker_a.put(key(worker_a), ["result"])
+
+    worker_b.bump_generation("docs")
+    # Within the interval the worker still uses its own copy of the counters
+    assert worker_a.get(key(worker_a)) == ["result"]
+
+    now[0] += 0.2
+    assert worker_a.get(key(worker_a)) is None
+
+
+def test_own_bumps_are_seen_immediately(tmp_path):
+    cache = QueryResultCache(generation_dir=str(tmp_path), generation_check_interval=60)
+    cache.put(key(cache), ["result"])
+    cache.bump_generation("docs")
+    assert cache.get(key(cache)) is None
+
+
+def test_disabled_cache_stores_nothing():
+    cache = QueryResultCache(max_entries=0)
+    cache.put(key(cache), ["result"])
+    assert cache.get(key(cache)) is None
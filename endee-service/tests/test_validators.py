@@ -0,0 +1,95 @@
+import math
+import numpy as np
+from validators import validate_vector, validate_sparse_vector, validate_vector_batch
+
+
+def dense_item(vector_id, vector):
+    return {"id": vector_id, "vector": vector}
+
+
+def hybrid_item(vector_id, vector, indices, values):
+    return {"id": vector_id, "vector": vector, "sparse_indices": indices, "sparse_values": values}
+
+
+def test_valid_batch_has_no_errors():
+    items = [dense_item(str(i), [0.1, 0.2, 0.3]) for i in range(5)]
+    assert validate_vector_batch(items, 3) == []
+
+
+def test_nan_and_infinity_are_reported_at_their_position():
+    items = [
+        dense_item("a", [0.1, 0.2, 0.3]),
+        dense_item("b", [0.1, math.nan, 0.3]),
+        dense_item("c", [0.1, 0.2, 0.3]),
+        dense_item("d", [math.inf, 0.2, 0.3]),
+    ]
+    errors = validate_vector_batch(items, 3)
+    assert [e["position"] for e in errors] == [1, 3]
+    assert all(e["error"] == "vector must not contain NaN or Infinity" for e in errors)
+
+
+def test_item_errors_are_sorted_by_position():
+    items = [
+        dense_item("a", [0.1, math.nan, 0.3]),
+        dense_item("b", [0.1, 0.2]),
+        {"vector": [0.1, 0.2, 0.3]},
+        "not an object",
+    ]
+    errors = validate_vector_batch(items, 3)
+    assert errors == [
+        {"position": 0, "error": "vector must not contain NaN or Infinity"},
+        {"position": 1, "error": "vectors should be of the dimensions 3"},
+        {"position": 2, "error": "id is required"},
+        {"position": 3, "error": "each vector must be a JSON object"},
+    ]
+
+
+def test_non_numeric_rows_are_located():
+    items = [dense_item("a", [0.1, 0.2, 0.3]), dense_item("b", [0.1, "x", 0.3])]
+    assert validate_vector_batch(items, 3) == [{"position": 1, "error": "vector must contain only numbers"}]
+
+
+def test_sparse_out_of_bounds_and_nan_positions():
+    items = [
+        hybrid_item("a", [0.1, 0.2], [1, 5], [0.5, 0.5]),
+        hybrid_item("b", [0.1, 0.2], [1, 10], [0.5, 0.5]),
+        hybrid_item("c", [0.1, 0.2], [2], [math.nan]),
+        hybrid_item("d", [0.1, 0.2], [-1], [math.nan]),
+    ]
+    errors = validate_vector_batch(items, 2, sparse_dim=10)
+    # An item with both problems is only reported once, as out of bounds
+    assert errors == [
+        {"position": 1, "error": "Sparse index out of bounds"},
+        {"position": 2, "error": "sparse_values must not contain NaN or Infinity"},
+        {"position": 3, "error": "Sparse index out of bounds"},
+    ]
+
+
+def test_sparse_length_mismatch_and_missing_sparse_data():
+    items = [
+        hybrid_item("a", [0.1, 0.2], [1, 2], [0.5]),
+        dense_item("b", [0.1, 0.2]),
+    ]
+    errors = validate_vector_batch(items, 2, sparse_dim=10)
+    assert errors == [
+        {"position": 0, "error": "Sparse Indices and Values should have the same length"},
+        {"position": 1, "error": "sparse_indices and sparse_values are required"},
+    ]
+
+
+def test_non_integer_sparse_indices_fall_back_to_per_item_checks():
+    items = [
+        hybrid_item("a", [0.1, 0.2], [1, 2], [0.5, 0.5]),
+        hybrid_item("b", [0.1, 0.2], [1.5, 2], [0.5, 0.5]),
+    ]
+    assert validate_vector_batch(items, 2, sparse_dim=10) == [
+        {"position": 1, "error": "sparse_indices must contain only integers"}
+    ]
+
+
+def test_single_vector_validators():
+    assert validate_vector([]) == "vector must be a non-empty list"
+    assert validate_vector(np.array([0.1, np.nan])) == "vector must not contain NaN or Infinity"
+    assert validate_vector([0.1, 0.2]) is None
+    assert validate_sparse_vector([0, 9], [1.0, 2.0], 10) is None
+    assert validate_sparse_vector([0, 10], [1.0, 2.0], 10) == "Sparse index out of bounds"
@@ -1,4 +1,5 @@
 import re
+import numpy as np
 
 INDEX_NAME_REGEX = re.compile(r"^[A-Za-z0-9_]+$")
 
@@ -44,12 +45,229 @@ def validate_top_k(top_k, max_k=512):
     return None
 
 
+NUMERIC_KINDS = "biuf"
+INTEGER_KINDS = "iu"
+
+
+# Converts a list (or an already decoded array) without looping in Python
+def as_array(values):
+    if isinstance(values, np.ndarray):
+        return values
+    try:
+        return np.asarray(values)
+    except (TypeError, ValueError):
+        return None
+
+
 # Validating the EMBEDDED VECTORS
 def validate_vector(vector):
-    if not isinstance(vector, list) or not vector:
+    if not isinstance(vector, (list, np.ndarray)) or len(vector) == 0:
         return "vector must be a non-empty list"
-    if not all(isinstance(x, (int, float)) for x in vector):
+    arr = as_array(vector)
+    if arr is None or arr.ndim != 1 or arr.dtype.kind not in NUMERIC_KINDS:
         return "vector must contain only numbers"
+    if not np.isfinite(arr).all():
+        return "vector must not contain NaN or Infinity"
+    return None
+
+
+# Validating the SPARSE INDICES and VALUES of a single vector
+def validate_sparse_vector(sparse_indices, sparse_values, sparse_dim):
+    if sparse_indices is None or sparse_values is None or len(sparse_indices) == 0 or len(sparse_values) == 0:
+        return "sparse_indices and sparse_values are required"
+    if len(sparse_values) != len(sparse_indices):
+        return "Sparse Indices and Values should have the same length"
+
+    indices, values = as_array(sparse_indices), as_array(sparse_values)
+    if indices is None or indices.ndim != 1 or indices.dtype.kind not in INTEGER_KINDS:
+        return "sparse_indices must contain only integers"
+    if values is None or values.ndim != 1 or values.dtype.kind not in NUMERIC_KINDS:
+        return "sparse_values must contain only numbers"
+    if indices.min() < 0 or indices.max() >= sparse_dim:
+        return "Sparse index out of bounds"
+    if not np.isfinite(values).all():
+        return "sparse_values must not contain NaN or Infinity"
+    return None
+
+
+"""
+Validates a whole upsert batch at once and returns a list of
+{"position", "error"} entries (empty when the batch is valid).
+The per-item pass only looks at lengths; the numeric checks (types,
+NaN/Inf, sparse bounds) run on the stacked arrays in NumPy.
+When sparse_dim is given the items must also carry sparse data.
+"""
+def validate_vector_batch(embedded_vectors, dimension, sparse_dim=None):
+    errors = []
+    dense_positions, dense = [], []
+    sparse_positions, sparse_indices, sparse_values = [], [], []
+
+    for position, item in enumerate(embedded_vectors):
+        if not isinstance(item, dict):
+            errors.append({"position": position, "error": "each vector must be a JSON object"})
+            continue
+        if item.get("id") is None or item.get("id") == "":
+            errors.append({"position": position, "error": "id is required"})
+            continue
+
+        vector = item.get("vector")
+        if not isinstance(vector, (list, np.ndarray)) or len(vector) != dimension:
+            errors.append({
+                "position": position,
+                "error": f"vectors should be of the dimensions {dimension}"
+            })
+            continue
+
+        if sparse_dim is not None:
+            indices, values = item.get("sparse_indices"), item.get("sparse_values")
+            if not isinstance(indices, (list, np.ndarray)) or not isinstance(values, (list, np.ndarray)) \
+                    or len(indices) == 0 or len(values) == 0:
+                errors.append({"position": position, "error": "sparse_indices and sparse_values are required"})
+                continue
+            if len(indices) != len(values):
+                errors.append({
+                    "position": position,
+                    "error": "Sparse Indices and Values should have the same length"
+                })
+                continue
+            sparse_positions.append(position)
+            sparse_indices.append(indices)
+            sparse_values.append(values)
+
+        dense_positions.append(position)
+        dense.append(vector)
+
+    if dense:
+        errors.extend(_check_dense_matrix(dense, dense_positions))
+    if sparse_positions:
+        errors.extend(_check_sparse_batch(sparse_indices, sparse_values, sparse_positions, sparse_dim))
+
+    errors.sort(key=lambda e: e["position"])
+    return errors
+
+
+def _check_dense_matrix(vectors, positions):
+    matrix = as_array(vectors)
+    if matrix is None or matrix.ndim != 2 or matrix.dtype.kind not in NUMERIC_KINDS:
+        # Mixed or non-numeric content: fall back to locating the bad rows
+        return [
+            {"position": position, "error": error}
+            for position, error in zip(positions, map(validate_vector, vectors))
+            if error
+        ]
+
+    bad_rows = np.flatnonzero(~np.isfinite(matrix).all(axis=1))
+    return [
+        {"position": positions[row], "error": "vector must not contain NaN or Infinity"}
+        for row in bad_rows
+    ]
+
+
+def _check_sparse_batch(indices_list, values_list, positions, sparse_dim):
+    lengths = np.fromiter(map(len, indices_list), dtype=np.int64, count=len(indices_list))
+    try:
+        indices = np.concatenate([as_array(i) for i in indices_list])
+        values = np.concatenate([as_array(v) for v in values_list])
+    except (TypeError, ValueError):
+        indices = values = None
+
+    if indices is None or indices.dtype.kind not in INTEGER_KINDS or values.dtype.kind not in NUMERIC_KINDS:
+        return [
+            {"position": position, "error": error}
+            for position, error in zip(
+                positions,
+                (validate_sparse_vector(i, v, sparse_dim) for i, v in zip(indices_list, values_list))
+            )
+            if error
+        ]
+
+    # Map every sparse entry back to the item it belongs to
+    owners = np.repeat(np.asarray(positions), lengths)
+    errors = []
+    out_of_bounds = np.unique(owners[(indices < 0) | (indices >= sparse_dim)])
+    errors.extend({"position": int(p), "error": "Sparse index out of bounds"} for p in out_of_bounds)
+    not_finite = np.setdiff1d(np.unique(owners[~np.isfinite(values)]), out_of_bounds)
+    errors.extend(
+        {"position": int(p), "error": "sparse_values must not contain NaN or Infinity"}
+        for p in not_finite
+    )
+    return errors
+
+
+# Validating the FIELDS projection of a query
+def validate_fields(fields, allowed):
+    if not isinstance(fields, (list, tuple)) or not fields:
+        return "fields must be a non-empty list"
+    unknown = [f for f in fields if not isinstance(f, str) or f not in allowed]
+    if unknown:
+        return f"fields must be chosen from {sorted(allowed)}"
+    return None
+
+
+# Validating the FUSION options of a hybrid query
+def validate_fusion(mode, alpha, overfetch, rrf_k, modes, max_overfetch=10):
+    if mode not in modes:
+        return f"fusion must be one of {sorted(modes)}"
+    if isinstance(alpha, bool) or not isinstance(alpha, (int, float)) or not 0 <= alpha <= 1:
+        return "alpha must be a number between 0 and 1"
+    if isinstance(overfetch, bool) or not isinstance(overfetch, int) or not 1 <= overfetch <= max_overfetch:
+        return f"overfetch must be an integer between 1 and {max_overfetch}"
+    if isinstance(rrf_k, bool) or not isinstance(rrf_k, int) or rrf_k <= 0:
+        return "rrf_k must be a positive integer"
+    return None
+
+
+# Validating a batch of vector IDS to delete
+def validate_ids(ids, max_ids):
+    if not isinstance(ids, list) or not ids:
+        return "ids must be a non-empty list"
+    if len(ids) > max_ids:
+        return f"at most {max_ids} ids can be sent at once"
+    if any(isinstance(i, bool) or not isinstance(i, (str, int)) or i == "" for i in ids):
+        return "each id must be a non-empty string or an integer"
+    return None
+
+
+"""
+Validating the metadata MATCHES of a delete: a list of {field: value} objects,
+where a list value matches any of its elements. Only fields mirrored into the
+vector filter on upsert can be matched.
+"""
+def validate_metadata_matches(matches, allowed_fields, max_matches):
+    if not isinstance(matches, list) or not matches:
+        return "match must be a non-empty list of objects"
+    if len(matches) > max_matches:
+        return f"at most {max_matches} match objects can be sent at once"
+    for match in matches:
+        if not isinstance(match, dict) or not match:
+            return "each match must be a non-empty object"
+        for field, value in match.items():
+            if field not in allowed_fields:
+                return f"match fields must be chosen from {sorted(allowed_fields)}"
+            values = value if isinstance(value, list) else [value]
+            if not values or any(v is None or isinstance(v, (dict, list)) for v in values):
+                return f"match value of {field} must be a scalar or a non-empty list of scalars"
+    return None
+
+
+# Validating a batch of metadata UPDATES: [{"id": ..., "meta": {...}}]
+def validate_meta_updates(updates, max_updates):
+    if not isinstance(updates, list) or not updates:
+        return "updates must be a non-empty list"
+    if len(updates) > max_updates:
+        return f"at most {max_updates} updates can be sent at once"
+    ids = set()
+    for update in updates:
+        if not isinstance(update, dict):
+            return "each update must be a JSON object"
+        vector_id = update.get("id")
+        if isinstance(vector_id, bool) or not isinstance(vector_id, (str, int)) or vector_id == "":
+            return "each update needs an id (string or integer)"
+        if not isinstance(update.get("meta"), dict):
+            return "each update needs a meta object"
+        if str(vector_id) in ids:
+            return f"duplicate id in updates: {vector_id}"
+        ids.add(str(vector_id))
     return None
 
 
@@ -0,0 +1,91 @@
+import msgpack
+import numpy as np
+
+"""
+Binary wire format for vectors.
+
+Instead of JSON float lists, clients may send the same payload as a msgpack
+body (Content-Type: application/msgpack) where the vector fields are raw
+little-endian buffers:
+    vector          -> float32 (or float16 when "dtype" is "float16")
+    sparse_indices  -> int32
+    sparse_values   -> float32
+The buffers are turned into NumPy arrays with np.frombuffer (no copy), so the
+service never builds Python float lists while parsing the request.
+"""
+MSGPACK_CONTENT_TYPES = {"application/msgpack", "application/x-msgpack"}
+
+VECTOR_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+SPARSE_INDEX_DTYPE = np.dtype("<i4")
+SPARSE_VALUE_DTYPE = np.dtype("<f4")
+
+
+def is_msgpack_request(req):
+    return req.mimetype in MSGPACK_CONTENT_TYPES
+
+
+# Converts one field, leaving plain lists (JSON style) untouched
+def decode_buffer(value, dtype):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        if len(value) % dtype.itemsize:
+            raise ValueError(f"buffer size is not a multiple of {dtype.itemsize} bytes")
+        return np.frombuffer(value, dtype=dtype)
+    return value
+
+
+def decode_vector_fields(item, vector_dtype):
+    if not isinstance(item, dict):
+        return item
+    if "vector" in item:
+        item["vector"] = decode_buffer(item["vector"], vector_dtype)
+    if "sparse_indices" in item:
+        item["sparse_indices"] = decode_buffer(item["sparse_indices"], SPARSE_INDEX_DTYPE)
+    if "sparse_values" in item:
+        item["sparse_values"] = decode_buffer(item["sparse_values"], SPARSE_VALUE_DTYPE)
+    return item
+
+
+# Returns (data, error) the same way the JSON helper does
+def decode_msgpack_body(raw):
+    try:
+        data = msgpack.unpackb(raw, raw=False)
+    except Exception:
+        return None, "Invalid msgpack body"
+    if not isinstance(data, dict) or not data:
+        return None, "Invalid or missing msgpack body"
+
+    dtype_name = data.pop("dtype", "float32")
+    vector_dtype = VECTOR_DTYPES.get(dtype_name)
+    if vector_dtype is None:
+        return None, f"dtype must be one of {sorted(VECTOR_DTYPES)}"
+
+    try:
+        decode_vector_fields(data, vector_dtype)
+        for key in ("embedded_vectors", "queries"):
+            if isinstance(data.get(key), list):
+                for item in data[key]:
+                    decode_vector_fields(item, vector_dtype)
+    except ValueError as e:
+        return None, str(e)
+
+    return data, None
+
+
+# The Endee SDK validates with pydantic and only accepts plain lists
+def to_list(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def vectors_to_lists(embedded_vectors):
+    for item in embedded_vectors:
+        if not isinstance(item, dict):
+            continue
+        for key in ("vector", "sparse_indices", "sparse_values"):
+            if key in item:
+                item[key] = to_list(item[key])
+    return embedded_vectors
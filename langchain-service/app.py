@@ -1,29 +1,28 @@
 import streamlit as st
 import tempfile
 import os
+import time
+from itertools import chain
 
 # -------------------------------
 # DATA INGESTION
-from ingestion.loaders import load_markdown, load_pdf
-from ingestion.preprocessing import filter_docs
-from ingestion.chunking import text_split
-from ingestion.vectorize_data import (
-    vectorize_single_index,
-    vectorize_hybrid_index
-)
-from ingestion.upsert import (
-    upsert_single_index,
-    upsert_hybrid_index
-)
-from rag.rag_helper import create_load_dbs
+from ingestion.pipeline import run_pipeline, PARSE_WORKERS
+from rag.rag_helper import create_load_dbs, embed_query_dense
+from rag.query_cache import query_embedding_cache
+from rag.answer_cache import answer_cache
+from ingestion.embedding_cache import cache_stats as embedding_cache_stats
 
 # -------------------------------
 # RAG PIPELINE
 from rag.rag_pipeline import (
     single_rag_chain, 
-    hybrid_rag_chain
+    hybrid_rag_chain,
+    stream_with_timings
 )
 
+# Render answers token by token instead of waiting for the full completion
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "true").lower() == "true"
+
 @st.cache_resource
 def startup_logic():
     print("startup_logic executed")
@@ -146,7 +145,7 @@ with st.sidebar:
 
     if st.button("📥 Ingest Documents") and uploaded_files:
         with st.spinner("Processing documents..."):
-            all_docs = []
+            progress = st.empty()
 
             with tempfile.TemporaryDirectory() as tmpdir:
                 for file in uploaded_files:
@@ -154,23 +153,57 @@ with st.sidebar:
                     with open(file_path, "wb") as f:
                         f.write(file.read())
 
-                # Load documents
-                all_docs.extend(load_pdf(tmpdir))
-                all_docs.extend(load_markdown(tmpdir))
+                # Load → Preprocess → Chunk → Vectorize → Upsert, stages running concurrently
+                report = run_pipeline(
+                    tmpdir,
+                    hybrid=st.session_state.mode != "Normal",
+                    # Small uploads are not worth starting a process per file
+                    parse_workers=min(PARSE_WORKERS, len(uploaded_files)),
+                    on_progress=lambda r: progress.caption(
+                        f"{r['files']} files, {r['chunks']} chunks, {r['upserted']} vectors stored"
+                    )
+                )
+            progress.empty()
+
+        # Answers cached before this ingestion may be outdated now
+        if report["upserted"] or report["deleted"]:
+            answer_cache.invalidate()
+
+        errors = report["failed_files"] + report["failed_batches"]
+        for error in errors:
+            st.warning(error)
+        summary = (
+            f"{report['upserted']} new chunks, {report['deleted']} removed, "
+            f"{report['unchanged_files']} unchanged files skipped"
+        )
+        if errors:
+            st.error(f"⚠️ Ingestion finished with {len(errors)} errors ({summary}); failed files are retried on the next run")
+        else:
+            st.success(f"✅ Documents ingested successfully ({summary})")
+
+    st.divider()
 
-            # Preprocess → Chunk → Vectorize → Upsert
-            minimal_docs = filter_docs(all_docs)
-            chunks = text_split(minimal_docs)
+    # Shared by all sessions of this server process
+    with st.expander("📊 Cache stats"):
+        st.caption("Answers")
+        st.json(answer_cache.stats())
+        st.caption("Query embeddings")
+        st.json(query_embedding_cache.stats())
+        st.caption("Ingestion embeddings (on disk)")
+        st.json(embedding_cache_stats())
 
-            if st.session_state.mode == "Normal":
-                vectors = vectorize_single_index(chunks)
-                result = upsert_single_index(vectors)
-            else:
-                vectors = vectorize_hybrid_index(chunks)
-                result = upsert_hybrid_index(vectors)
 
-        st.success("✅ Documents ingested successfully")
 
+def format_response_stats(timings, context_stats=None, cached=None):
+    parts = []
+    if cached:
+        parts.append(f"cached answer (similarity {cached['similarity']:.2f}, ~{cached['seconds']:.2f}s saved)")
+    if "ttft_seconds" in timings:
+        parts.append(f"first token {timings['ttft_seconds']:.2f}s")
+    parts.append(f"total {timings['total_seconds']:.2f}s")
+    if context_stats:
+        parts.append(f"context ~{context_stats['tokens_out']} tokens ({context_stats['tokens_saved']} saved)")
+    return "⏱️ " + " · ".join(parts)
 
 
 # -------------------------------
@@ -178,6 +211,8 @@ with st.sidebar:
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])  # preserves markdown styling
+        if msg.get("timings"):
+            st.caption(format_response_stats(msg["timings"], msg.get("context_stats"), msg.get("cached")))
 
 
 # -------------------------------
@@ -203,23 +238,53 @@ if user_input:
 
     # Bot response
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-
-            invoke_payload = {
-                "input": user_input,
-                "company_name": st.session_state.company_name,
-                "bot_name": st.session_state.bot_name,
-                "custom_prompt": st.session_state.custom_prompt
-            }
-
-            if st.session_state.mode == "Normal":
-                response = single_rag_chain.invoke(invoke_payload)
-            else:
-                response = hybrid_rag_chain.invoke(invoke_payload)
-
-        st.markdown(response)
+        invoke_payload = {
+            "input": user_input,
+            "company_name": st.session_state.company_name,
+            "bot_name": st.session_state.bot_name,
+            "custom_prompt": st.session_state.custom_prompt,
+            "context_stats": {}
+        }
+        rag_chain = single_rag_chain if st.session_state.mode == "Normal" else hybrid_rag_chain
+
+        # Near-duplicate questions of the same mode and persona are answered from the cache
+        started = time.perf_counter()
+        scope = (
+            st.session_state.mode,
+            st.session_state.company_name,
+            st.session_state.bot_name,
+            st.session_state.custom_prompt
+        )
+        query_vector = embed_query_dense(user_input)
+        cached, cache_generation = answer_cache.lookup(scope, query_vector)
+
+        timings = {}
+        if cached:
+            # No context was built for this answer, so context_stats stays empty
+            response = cached["answer"]
+            timings["total_seconds"] = round(time.perf_counter() - started, 3)
+            st.markdown(response)
+        elif STREAM_RESPONSES:
+            stream = stream_with_timings(rag_chain, invoke_payload, timings)
+            # The spinner covers retrieval and the wait for the first token only
+            with st.spinner("Thinking..."):
+                first_chunk = next(stream, "")
+            response = st.write_stream(chain([first_chunk], stream))
+        else:
+            started = time.perf_counter()
+            with st.spinner("Thinking..."):
+                response = rag_chain.invoke(invoke_payload)
+            timings["total_seconds"] = round(time.perf_counter() - started, 3)
+            st.markdown(response)
+
+        if not cached:
+            answer_cache.store(scope, query_vector, response, timings["total_seconds"], cache_generation)
+        st.caption(format_response_stats(timings, invoke_payload["context_stats"], cached))
 
     st.session_state.messages.append({
         "role": "assistant",
-        "content": response
+        "content": response,
+        "timings": timings,
+        "context_stats": invoke_payload["context_stats"],
+        "cached": cached
     })
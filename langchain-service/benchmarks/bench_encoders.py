@@ -0,0 +1,140 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+import numpy as np
+
+"""
+Parity check and throughput benchmark of the embedding backends.
+
+The PyTorch models are the reference. For every other backend the script
+reports the cosine similarity of the dense embeddings and the overlap of
+the SPLADE terms with the reference, then the throughput of batch encoding
+(ingestion) and the latency of single-text encoding (queries).
+
+    python benchmarks/bench_encoders.py --quantization none avx2
+    python benchmarks/bench_encoders.py --texts data/sample.txt --skip-sparse
+
+The exit code is 1 when a backend falls below --min-cosine or --min-overlap.
+"""
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from rag.embeddings import (  # noqa: E402
+    EMBEDDING_MODEL,
+    build_dense_model,
+    build_sparse_model,
+    sparse_encode_batch
+)
+
+SAMPLE_TEXTS = [
+    "Employees are entitled to 24 days of paid annual leave per calendar year.",
+    "Reset your VPN password from the self-service portal before it expires.",
+    "Expense reports must be submitted within 30 days together with the receipts.",
+    "The onboarding checklist covers laptop setup, badge access and security training.",
+    "Remote work requires manager approval and a secure home network connection.",
+    "Production incidents are escalated to the on-call engineer through the paging system.",
+    "Quarterly performance reviews focus on goals, feedback and career development.",
+    "Customer data may only be stored in approved regions and encrypted at rest.",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare the torch and ONNX embedding backends")
+    parser.add_argument("--quantization", nargs="+", default=["none", "avx2"],
+                        help="ONNX quantization configs to compare against torch")
+    parser.add_argument("--texts", help="File with one text per line (default: built-in sample)")
+    parser.add_argument("--count", type=int, default=512, help="Texts encoded in the throughput runs")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=50, help="Single-text encodings for the latency run")
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--min-overlap", type=float, default=0.9)
+    parser.add_argument("--skip-sparse", action="store_true", help="Only benchmark the dense model")
+    return parser.parse_args()
+
+
+def load_texts(args):
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = SAMPLE_TEXTS
+    return [texts[i % len(texts)] for i in range(args.count)]
+
+
+# Jaccard overlap of the SPLADE term sets, averaged over the texts
+def term_overlap(reference, candidate):
+    overlaps = []
+    for (ref_indices, _), (indices, _) in zip(reference, candidate):
+        ref_set, cand_set = set(ref_indices), set(indices)
+        union = ref_set | cand_set
+        overlaps.append(len(ref_set & cand_set) / len(union) if union else 1.0)
+    return float(np.mean(overlaps))
+
+
+def timed(func, repeat=1):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - started)
+    return result, durations
+
+
+def bench_backend(name, dense_model, sparse_model, texts, args):
+    row = {"backend": name}
+    dense_model.encode(texts[:2])  # warm-up
+    embeddings, durations = timed(lambda: dense_model.encode(
+        texts, batch_size=args.batch_size, convert_to_numpy=True, normalize_embeddings=True
+    ))
+    row["dense"] = embeddings
+    row["dense_throughput"] = len(texts) / durations[0]
+    _, durations = timed(lambda: dense_model.encode(texts[0]), repeat=args.queries)
+    row["dense_query_ms"] = statistics.median(durations) * 1000
+
+    if sparse_model is not None:
+        sparse_encode_batch(texts[:2], model=sparse_model)  # warm-up
+        sparse, durations = timed(lambda: sparse_encode_batch(texts, model=sparse_model))
+        row["sparse"] = sparse
+        row["sparse_throughput"] = len(texts) / durations[0]
+        _, durations = timed(lambda: sparse_encode_batch(texts[:1], model=sparse_model), repeat=args.queries)
+        row["sparse_query_ms"] = statistics.median(durations) * 1000
+    return row
+
+
+def main():
+    args = parse_args()
+    texts = load_texts(args)
+    sparse = not args.skip_sparse
+
+    backends = [("torch", "torch", "none")] + [(f"onnx/{q}", "onnx", q) for q in args.quantization]
+    rows = []
+    for name, backend, quantization in backends:
+        dense_model = build_dense_model(EMBEDDING_MODEL, backend=backend, quantization=quantization)
+        sparse_model = build_sparse_model(backend=backend, quantization=quantization) if sparse else None
+        rows.append(bench_backend(name, dense_model, sparse_model, texts, args))
+
+    reference = rows[0]
+    failed = False
+    print(f"{len(texts)} texts, batch size {args.batch_size}")
+    for row in rows:
+        cosine = np.einsum("ij,ij->i", reference["dense"], row["dense"])
+        line = (f"{row['backend']:<18} dense {row['dense_throughput']:8.1f} texts/s  "
+                f"query {row['dense_query_ms']:6.2f} ms  cosine min={cosine.min():.4f} mean={cosine.mean():.4f}")
+        failed |= cosine.min() < args.min_cosine
+        if sparse:
+            overlap = term_overlap(reference["sparse"], row["sparse"])
+            line += (f" | sparse {row['sparse_throughput']:8.1f} texts/s  "
+                     f"query {row['sparse_query_ms']:6.2f} ms  term overlap={overlap:.4f}")
+            failed |= overlap < args.min_overlap
+        print(line)
+
+    if failed:
+        print(f"parity check failed (min cosine {args.min_cosine}, min term overlap {args.min_overlap})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+"""
+Latency of Pro mode retrieval with sequential vs parallel query encoding.
+
+Every query is encoded with the query embedding cache cleared, so both
+models always run. By default the full hybrid_index_retriever is timed
+(endee-service must be running and the hybrid index created); with
+--encode-only only the dense + SPLADE encoding is timed. It also checks
+that the thread budgets of the parallel mode do not leak into the torch
+threads of other threads (e.g. Streamlit's script threads).
+
+    python benchmarks/bench_query_encoding.py --queries 100
+    SPARSE_QUERY_THREADS=6 DENSE_QUERY_THREADS=2 python benchmarks/bench_query_encoding.py --encode-only
+"""
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+import torch  # noqa: E402
+from rag.query_cache import query_embedding_cache  # noqa: E402
+from rag.rag_helper import (  # noqa: E402
+    DENSE_QUERY_THREADS,
+    SPARSE_QUERY_THREADS,
+    embed_query_hybrid,
+    hybrid_index_retriever
+)
+
+SAMPLE_QUERIES = [
+    "How many days of paid annual leave do employees get?",
+    "How do I reset my VPN password?",
+    "What is the deadline for submitting expense reports?",
+    "What does the onboarding checklist include?",
+    "Who approves remote work requests?",
+    "How are production incidents escalated?",
+    "What do quarterly performance reviews focus on?",
+    "Where may customer data be stored?",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare sequential and parallel Pro mode query encoding")
+    parser.add_argument("--queries", type=int, default=50, help="Timed queries per mode")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed queries per mode")
+    parser.add_argument("--encode-only", action="store_true", help="Time the encoders without the HTTP call")
+    return parser.parse_args()
+
+
+def run(parallel, count, encode_only):
+    durations = []
+    for i in range(count):
+        query = SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)]
+        query_embedding_cache.clear()
+        started = time.perf_counter()
+        if encode_only:
+            embed_query_hybrid(query, parallel=parallel)
+        else:
+            hybrid_index_retriever(query, parallel=parallel)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+# torch intra-op threads a freshly started thread gets
+def new_thread_torch_threads():
+    result = []
+    thread = threading.Thread(target=lambda: result.append(torch.get_num_threads()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def percentile(durations, q):
+    ordered = sorted(durations)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    args = parse_args()
+    print(f"{os.cpu_count()} CPUs, parallel budgets: sparse {SPARSE_QUERY_THREADS} / dense {DENSE_QUERY_THREADS} threads")
+    print("timing " + ("encoding only" if args.encode_only else "end-to-end hybrid retrieval"))
+
+    default_threads = new_thread_torch_threads()
+    medians = {}
+    for name, parallel in (("sequential", False), ("parallel", True)):
+        run(parallel, args.warmup, args.encode_only)
+        durations = run(parallel, args.queries, args.encode_only)
+        medians[name] = statistics.median(durations)
+        print(f"{name:<11} p50 {medians[name] * 1000:7.2f} ms  p95 {percentile(durations, 0.95) * 1000:7.2f} ms")
+
+    change = (medians["parallel"] - medians["sequential"]) / medians["sequential"] * 100
+    print(f"p50 change with parallel encoding: {change:+.1f}%")
+    print(f"torch threads of a new thread: {default_threads} before, {new_thread_torch_threads()} after")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import numpy as np
+
+"""
+Persistent, content-addressed cache of chunk embeddings for ingestion.
+
+Entries are keyed by a hash of the chunk text, inside a namespace made of
+the model name and revision, inference backend and quantization (see
+ingestion/vectorize_data.py), so changing any of them, including updated
+weights under the same model name, starts a fresh cache. Each namespace is a directory holding
+
+- dense.f32: a memory-mapped float32 array with one row per slot,
+- index.sqlite: key -> slot, last use, and the sparse vectors as compact
+  int32 / float32 blobs.
+
+At most EMBEDDING_CACHE_MAX_ENTRIES entries are kept per namespace; the least
+recently used ones are evicted and their slots reused. The cache assumes one
+writing process at a time (the ingestion run), readers may be concurrent.
+"""
+EMBEDDING_CACHE_DIR = Path(os.getenv("EMBEDDING_CACHE_DIR", os.path.expanduser("~/.cache/enterprise-rag/embeddings")))
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+CACHE_FORMAT_VERSION = 1
+SQLITE_MAX_PARAMS = 500
+
+
+def text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, namespace, max_entries=EMBEDDING_CACHE_MAX_ENTRIES, directory=EMBEDDING_CACHE_DIR):
+        self.namespace = f"v{CACHE_FORMAT_VERSION}:{namespace}"
+        self.max_entries = max_entries
+        self.path = Path(directory) / hashlib.sha1(self.namespace.encode("utf-8")).hexdigest()[:16]
+        self.path.mkdir(parents=True, exist_ok=True)
+        (self.path / "namespace.txt").write_text(self.namespace + "\n", encoding="utf-8")
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path / "index.sqlite"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key BLOB PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL, "
+            "sparse_indices BLOB, sparse_values BLOB)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+
+        self._dense = None
+        self._open_dense()
+        used = {row[0] for row in self._db.execute("SELECT slot FROM entries")}
+        # A smaller cap than the one the cache was built with drops everything past it
+        if any(slot >= max_entries for slot in used):
+            self._db.execute("DELETE FROM entries WHERE slot >= ?", (max_entries,))
+            used = {slot for slot in used if slot < max_entries}
+        self._free = [slot for slot in range(max_entries - 1, -1, -1) if slot not in used]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # The dense array is created on the first store, when the dimension is known
+    def _open_dense(self, dimension=None):
+        meta_path = self.path / "dense.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            if meta["rows"] == self.max_entries and (dimension is None or meta["dimension"] == dimension):
+                self._dense = np.memmap(
+                    self.path / "dense.f32", dtype=np.float32, mode="r+", shape=(meta["rows"], meta["dimension"])
+                )
+                return
+            # Built with another cap or dimension: the rows no longer line up with the slots
+            self._db.execute("DELETE FROM entries")
+            self._free = list(range(self.max_entries - 1, -1, -1))
+            meta_path.unlink()
+        if dimension is None:
+            return
+        self._dense = np.memmap(
+            self.path / "dense.f32", dtype=np.float32, mode="w+", shape=(self.max_entries, dimension)
+        )
+        meta_path.write_text(json.dumps({"rows": self.max_entries, "dimension": dimension}), encoding="utf-8")
+
+    def _select(self, keys):
+        rows = {}
+        for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+            chunk = keys[start: start + SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self._db.execute(
+                f"SELECT key, slot, sparse_indices, sparse_values FROM entries WHERE key IN ({placeholders})", chunk
+            ):
+                rows[row[0]] = row[1:]
+        return rows
+
+    """
+    Returns one entry per text, None for misses. Entries are
+    {"dense": float32 row or None, "sparse": (indices, values) or None}.
+    """
+    def lookup(self, texts):
+        keys = [text_key(t) for t in texts]
+        with self._lock:
+            rows = self._select(list(set(keys)))
+            if rows:
+                now = time.time()
+                self._db.execute("BEGIN")
+                self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, k) for k in rows])
+                self._db.execute("COMMIT")
+
+            results = []
+            for key in keys:
+                row = rows.get(key)
+                if row is None:
+                    results.append(None)
+                    continue
+                slot, sparse_indices, sparse_values = row
+                sparse = None
+                if sparse_indices is not None:
+                    sparse = (
+                        np.frombuffer(sparse_indices, dtype=np.int32).tolist(),
+                        np.frombuffer(sparse_values, dtype=np.float32).tolist(),
+                    )
+                dense = np.array(self._dense[slot]) if self._dense is not None else None
+                results.append({"dense": dense, "sparse": sparse})
+
+            self.hits += sum(1 for r in results if r is not None)
+            self.misses += sum(1 for r in results if r is None)
+            return results
+
+    # Takes free slots, evicting the least recently used entries (never the ones in keep) when full
+    def _allocate(self, count, keep):
+        if len(self._free) < count:
+            needed = count - len(self._free)
+            candidates = self._db.execute(
+                "SELECT key, slot FROM entries ORDER BY last_used LIMIT ?", (needed + len(keep),)
+            ).fetchall()
+            evicted = [(key, slot) for key, slot in candidates if key not in keep][:needed]
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in evicted])
+            self._free.extend(slot for _, slot in evicted)
+            self.evictions += len(evicted)
+        return [self._free.pop() for _ in range(count)]
+
+    # Stores dense rows and/or sparse (indices, values) pairs for the texts
+    def store(self, texts, dense=None, sparse=None):
+        if self.max_entries <= 0 or not texts:
+            return
+        entries = {}
+        for i, text in enumerate(texts):
+            entries.setdefault(text_key(text), i)
+
+        with self._lock:
+            existing = self._select(list(entries))
+            if dense is not None and self._dense is None:
+                self._open_dense(dimension=np.asarray(dense).shape[1])
+            new_keys = [key for key in entries if key not in existing][: self.max_entries - len(existing)]
+            slots = dict(zip(new_keys, self._allocate(len(new_keys), keep=existing)))
+            slots.update({key: row[0] for key, row in existing.items()})
+
+            now = time.time()
+            records = []
+            for key, position in entries.items():
+                if key not in slots:
+                    continue
+                slot = slots[key]
+                if dense is not None:
+                    self._dense[slot] = dense[position]
+                sparse_indices = sparse_values = None
+                if sparse is not None:
+                    sparse_indices = np.asarray(sparse[position][0], dtype=np.int32).tobytes()
+                    sparse_values = np.asarray(sparse[position][1], dtype=np.float32).tobytes()
+                elif key in existing:
+                    sparse_indices, sparse_values = existing[key][1], existing[key][2]
+                records.append((key, slot, now, sparse_indices, sparse_values))
+
+            if dense is not None:
+                self._dense.flush()
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", records)
+            self._db.execute("COMMIT")
+
+    def stats(self):
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "namespace": self.namespace,
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# One cache per namespace and process, opened on first use; None when disabled
+def get_cache(namespace):
+    if EMBEDDING_CACHE_MAX_ENTRIES <= 0:
+        return None
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = EmbeddingCache(namespace)
+        return cache
+
+
+def cache_stats():
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.stats() for cache in caches]
@@ -46,26 +46,31 @@ def load_textFile(file_path):
         print(f"Failed to load PDFs: {e}")
         return []
 
+# Loads one MARKDOWN FILE with its front matter (title, description)
+def load_markdown_file(file):
+    post = frontmatter.load(file)
+    return Document(
+        page_content=post.content,
+        metadata={
+            "title": post.get("title"),
+            "description": post.get("description"),
+            "source": str(file)
+        }
+    )
+
 # This will be the Function to load MARKDOWN FILES
 def load_markdown(file_path):
     docs = []
 
     for file in Path(file_path).rglob("*.md"):
         try:
-            post = frontmatter.load(file)
+            docs.append(load_markdown_file(file))
         except Exception as e:
             print(f"Skipping {file}: {e}")
             continue
 
-        docs.append(
-            Document(
-                page_content=post.content,
-                metadata={
-                    "title": post.get("title"),
-                    "description": post.get("description"),
-                    "source": str(file)
-                }
-            )
-        )
+    return docs
 
-    return docs
\ No newline at end of file
+# Loads one PDF FILE, one Document per page
+def load_pdf_file(file):
+    return PyPDFLoader(str(file)).load()
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+"""
+Ingestion manifest: what is already in an index, per source document.
+
+For every document (keyed by its path relative to the ingested directory)
+it keeps the hash of the file and the ids of its chunks. Chunk ids are
+derived from the document key and the chunk text, so an unchanged chunk
+always gets the same id. A sync can then skip unchanged files, upsert only
+new chunks of changed ones and delete the chunks that disappeared.
+"""
+INGEST_MANIFEST_DIR = Path(os.getenv("INGEST_MANIFEST_DIR", os.path.expanduser("~/.cache/enterprise-rag/manifests")))
+MANIFEST_VERSION = 1
+
+
+def make_chunk_id(doc_key, text):
+    return hashlib.blake2b(f"{doc_key}\x00{text}".encode("utf-8"), digest_size=16).hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Stores the stable id of every chunk of one document in its metadata
+def assign_chunk_ids(doc_key, chunks):
+    for chunk in chunks:
+        chunk.metadata["chunk_id"] = make_chunk_id(doc_key, chunk.page_content)
+    return [chunk.metadata["chunk_id"] for chunk in chunks]
+
+
+class IngestionManifest:
+    def __init__(self, index_name, directory=INGEST_MANIFEST_DIR):
+        self.index_name = index_name
+        self.path = Path(directory) / f"{index_name}.json"
+        self.documents = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == MANIFEST_VERSION:
+                self.documents = data.get("documents", {})
+
+    def get(self, doc_key):
+        return self.documents.get(doc_key)
+
+    def is_unchanged(self, doc_key, content_hash):
+        entry = self.documents.get(doc_key)
+        return entry is not None and entry["hash"] == content_hash
+
+    def record(self, doc_key, content_hash, chunk_ids):
+        self.documents[doc_key] = {
+            "hash": content_hash,
+            "chunk_ids": sorted(set(chunk_ids)),
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+
+    def remove(self, doc_key):
+        self.documents.pop(doc_key, None)
+
+    # Written to a temporary file first, so an interrupted run never leaves a broken manifest
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        tmp_path.write_text(
+            json.dumps({"version": MANIFEST_VERSION, "index_name": self.index_name, "documents": self.documents}),
+            encoding="utf-8"
+        )
+        os.replace(tmp_path, self.path)
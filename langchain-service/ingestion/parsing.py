@@ -0,0 +1,37 @@
+import os
+import time
+from pathlib import Path
+from ingestion.loaders import load_markdown_file, load_pdf_file
+from ingestion.preprocessing import filter_docs
+from ingestion.chunking import text_split
+
+"""
+Per-file stage of the ingestion pipeline: load -> clean -> chunk.
+
+Kept free of the model imports so the parse worker processes start quickly
+and do not load torch.
+"""
+SUPPORTED_EXTENSIONS = {".pdf", ".md"}
+
+
+# Every PDF and Markdown file under root, in a stable order
+def discover_files(root):
+    for path in sorted(Path(root).rglob("*")):
+        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
+            yield str(path)
+
+
+def load_file(path):
+    if path.lower().endswith(".pdf"):
+        return load_pdf_file(path)
+    return [load_markdown_file(path)]
+
+
+# Returns (path, chunks, error, seconds); errors are reported, not raised
+def parse_file(path):
+    started = time.perf_counter()
+    try:
+        chunks = text_split(filter_docs(load_file(path)))
+        return path, chunks, None, time.perf_counter() - started
+    except Exception as e:
+        return path, [], f"{os.path.basename(path)}: {e}", time.perf_counter() - started
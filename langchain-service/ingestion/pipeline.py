@@ -0,0 +1,288 @@
+import argparse
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from ingestion.parsing import discover_files, parse_file
+from ingestion.manifest import IngestionManifest, assign_chunk_ids, file_hash
+from ingestion.vectorize_data import vectorize_single_index, vectorize_hybrid_index
+from ingestion.upsert import (
+    SINGLE_INDEX_NAME,
+    HYBRID_INDEX_NAME,
+    upsert_single_index,
+    upsert_hybrid_index,
+    delete_single_index,
+    delete_hybrid_index,
+    purge_legacy_vectors
+)
+
+"""
+Streaming ingestion: files -> chunks -> vectors -> endee-service.
+
+The stages overlap instead of running one after the other over everything:
+
+- files are loaded, cleaned and chunked in a pool of worker processes, with
+  at most PARSE_MAX_PENDING files in flight (results are taken in file order,
+  so chunk ids are deterministic),
+- chunks are embedded in batches of INGEST_BATCH_SIZE as they arrive,
+- every embedded batch is upserted on a thread pool while the next one is
+  being embedded, with at most UPSERT_MAX_PENDING batches waiting.
+
+Only these bounded buffers are held in memory, never the whole corpus.
+
+Runs are incremental (see ingestion/manifest.py): files whose hash is in the
+manifest are not even parsed, changed files only embed and upsert their new
+chunks, and chunks that disappeared from a file are deleted. With prune=True
+documents that are no longer under the directory are deleted as well.
+
+Headless use, e.g. for large directory trees:
+
+    python -m ingestion.pipeline ./docs --mode pro
+"""
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PARSE_MAX_PENDING = int(os.getenv("PARSE_MAX_PENDING", str(2 * PARSE_WORKERS)))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "512"))
+UPSERT_CONCURRENCY = int(os.getenv("UPSERT_CONCURRENCY", "4"))
+UPSERT_MAX_PENDING = int(os.getenv("UPSERT_MAX_PENDING", str(2 * UPSERT_CONCURRENCY)))
+
+
+# Parsed files in input order; with workers <= 1 everything runs in this process
+def iter_parsed_files(paths, workers=PARSE_WORKERS, max_pending=PARSE_MAX_PENDING):
+    if workers <= 1:
+        for path in paths:
+            yield parse_file(path)
+        return
+
+    # spawn: forking a process that already holds torch threads can deadlock
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = deque()
+        for path in paths:
+            pending.append(pool.submit(parse_file, path))
+            if len(pending) >= max(max_pending, 1):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# Drops files whose content is already indexed, remembering key and hash of the others
+def iter_changed_files(paths, root, manifest, documents, report):
+    for path in paths:
+        doc_key = Path(path).relative_to(root).as_posix()
+        content_hash = file_hash(path)
+        documents[path] = {"key": doc_key, "hash": content_hash}
+        if manifest is not None and manifest.is_unchanged(doc_key, content_hash):
+            report["unchanged_files"] += 1
+            continue
+        yield path
+
+
+"""
+Regroups the new chunks of consecutive files into batches of batch_size.
+Chunks whose id is already indexed for that document are left out, and the
+ids that are no longer produced are queued for deletion.
+"""
+def iter_chunk_batches(parsed_files, batch_size, manifest, documents, report, incremental=True):
+    batch = []
+    for path, chunks, error, seconds in parsed_files:
+        report["files"] += 1
+        report["parse_seconds"] += seconds
+        document = documents[path]
+        if error:
+            report["failed_files"].append(error)
+            document["failed"] = True
+            continue
+
+        ids = assign_chunk_ids(document["key"], chunks)
+        previous = manifest.get(document["key"])
+        old_ids = set(previous["chunk_ids"]) if previous else set()
+        document.update({"ids": ids, "stale_ids": sorted(old_ids - set(ids)), "parsed": True})
+
+        # Repeated text in a document maps to one id, so it is sent once
+        skip_ids = set(old_ids) if incremental else set()
+        new_chunks = []
+        for chunk in chunks:
+            if chunk.metadata["chunk_id"] not in skip_ids:
+                skip_ids.add(chunk.metadata["chunk_id"])
+                chunk.metadata["doc_path"] = path
+                new_chunks.append(chunk)
+        report["chunks"] += len(chunks)
+        report["skipped_chunks"] += len(chunks) - len(new_chunks)
+
+        batch.extend(new_chunks)
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    if batch:
+        yield batch
+
+
+def _timed_upsert(upsert, vectors, doc_paths):
+    started = time.perf_counter()
+    result = upsert(vectors)
+    return len(vectors), doc_paths, result, time.perf_counter() - started
+
+
+def _collect_upserts(futures, documents, report):
+    for future in futures:
+        count, doc_paths, result, seconds = future.result()
+        report["upsert_seconds"] += seconds
+        if result.get("success"):
+            report["upserted"] += count
+        else:
+            report["failed_batches"].append(result.get("message"))
+            for path in doc_paths:
+                documents[path]["failed"] = True
+
+
+"""
+Deletes the stale chunks, then records every fully indexed document in the
+manifest. Documents with a failed parse, upsert or delete keep their old
+entry, so the next run retries them.
+"""
+def _sync_manifest(manifest, documents, delete, prune, report):
+    seen = {document["key"] for document in documents.values()}
+    stale = [
+        (document, document["stale_ids"]) for document in documents.values()
+        if document.get("parsed") and not document.get("failed") and document["stale_ids"]
+    ]
+    removed_docs = [key for key in manifest.documents if key not in seen] if prune else []
+
+    stale_ids = [i for _, ids in stale for i in ids]
+    stale_ids += [i for key in removed_docs for i in manifest.get(key)["chunk_ids"]]
+    if stale_ids:
+        result = delete(stale_ids)
+        if not result.get("success"):
+            report["failed_batches"].append(result.get("message"))
+            for document, _ in stale:
+                document["failed"] = True
+            removed_docs = []
+        else:
+            report["deleted"] += len(stale_ids)
+
+    for document in documents.values():
+        if document.get("parsed") and not document.get("failed"):
+            manifest.record(document["key"], document["hash"], document["ids"])
+    for key in removed_docs:
+        manifest.remove(key)
+    report["removed_files"] = len(removed_docs)
+    manifest.save()
+
+
+"""
+Ingests every PDF/Markdown file under root into the single (hybrid=False) or
+hybrid index and returns a report. on_progress(report) is called after every
+embedded batch. incremental=False ignores the manifest and re-ingests
+everything (the manifest is still updated).
+"""
+def run_pipeline(root, hybrid=False, batch_size=INGEST_BATCH_SIZE, parse_workers=PARSE_WORKERS,
+                 upsert_concurrency=UPSERT_CONCURRENCY, incremental=True, prune=False, on_progress=None):
+    vectorize = vectorize_hybrid_index if hybrid else vectorize_single_index
+    upsert = upsert_hybrid_index if hybrid else upsert_single_index
+    delete = delete_hybrid_index if hybrid else delete_single_index
+    manifest = IngestionManifest(HYBRID_INDEX_NAME if hybrid else SINGLE_INDEX_NAME)
+
+    started = time.perf_counter()
+    report = {
+        "files": 0,
+        "unchanged_files": 0,
+        "removed_files": 0,
+        "failed_files": [],
+        "chunks": 0,
+        "skipped_chunks": 0,
+        "vectors": 0,
+        "upserted": 0,
+        "deleted": 0,
+        "failed_batches": [],
+        "parse_seconds": 0.0,
+        "embed_seconds": 0.0,
+        "upsert_seconds": 0.0,
+    }
+
+    documents = {}
+    changed_files = iter_changed_files(
+        discover_files(root), root, manifest if incremental else None, documents, report
+    )
+    parsed_files = iter_parsed_files(changed_files, workers=parse_workers)
+    with ThreadPoolExecutor(max_workers=upsert_concurrency) as upsert_pool:
+        in_flight = set()
+        for batch in iter_chunk_batches(parsed_files, batch_size, manifest, documents, report, incremental):
+            embed_started = time.perf_counter()
+            vectors = vectorize(batch)
+            report["embed_seconds"] += time.perf_counter() - embed_started
+            report["vectors"] += len(vectors)
+
+            # Chunks the vectorizer skipped leave their document incomplete
+            produced = {vector["id"] for vector in vectors}
+            for chunk in batch:
+                if chunk.metadata["chunk_id"] not in produced:
+                    documents[chunk.metadata["doc_path"]]["failed"] = True
+
+            while len(in_flight) >= max(UPSERT_MAX_PENDING, 1):
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                _collect_upserts(done, documents, report)
+            if vectors:
+                doc_paths = {chunk.metadata["doc_path"] for chunk in batch}
+                in_flight.add(upsert_pool.submit(_timed_upsert, upsert, vectors, doc_paths))
+
+            if on_progress:
+                on_progress(report)
+
+        _collect_upserts(wait(in_flight).done, documents, report)
+
+    _sync_manifest(manifest, documents, delete, prune, report)
+
+    report["elapsed_seconds"] = round(time.perf_counter() - started, 2)
+    for key in ("parse_seconds", "embed_seconds", "upsert_seconds"):
+        report[key] = round(report[key], 2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a directory of PDF/Markdown files into endee-service")
+    parser.add_argument("root", help="Directory searched recursively for .pdf and .md files")
+    parser.add_argument("--mode", choices=["normal", "pro"], default="normal",
+                        help="normal: dense index, pro: hybrid (dense + SPLADE) index")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE, help="Chunks embedded per batch")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS, help="Processes parsing files")
+    parser.add_argument("--upsert-concurrency", type=int, default=UPSERT_CONCURRENCY,
+                        help="Batches upserted at the same time")
+    parser.add_argument("--full", action="store_true", help="Re-ingest every file, ignoring the manifest")
+    parser.add_argument("--prune", action="store_true",
+                        help="Delete documents that are in the index but no longer under root")
+    parser.add_argument("--purge-legacy-ids", action="store_true",
+                        help="First delete the chunks stored under the old integer ids (6000, 6001, ...)")
+    args = parser.parse_args()
+
+    from rag.rag_helper import create_load_dbs
+    create_load_dbs()
+
+    if args.purge_legacy_ids:
+        purged = purge_legacy_vectors(HYBRID_INDEX_NAME if args.mode == "pro" else SINGLE_INDEX_NAME)
+        print(purged["message"], flush=True)
+        if not purged["success"]:
+            raise SystemExit(1)
+
+    def progress(report):
+        print(f"files={report['files']} chunks={report['chunks']} upserted={report['upserted']}", flush=True)
+
+    report = run_pipeline(
+        args.root,
+        hybrid=args.mode == "pro",
+        batch_size=args.batch_size,
+        parse_workers=args.parse_workers,
+        upsert_concurrency=args.upsert_concurrency,
+        incremental=not args.full,
+        prune=args.prune,
+        on_progress=progress
+    )
+    for key, value in report.items():
+        print(f"{key}: {value}")
+    if report["failed_files"] or report["failed_batches"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,178 @@
 import os
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
 from requests.exceptions import ConnectionError, Timeout, HTTPError
+from rag.wire_format import request_body
 
 ENDEE_URL = os.getenv("ENDEE_SERVICE_URL", "http://localhost:8000")
 
 SINGLE_INDEX_QUERY_URL = f"{ENDEE_URL}/index/upsert"
 HYBRID_INDEX_QUERY_URL = f"{ENDEE_URL}/index/hybrid/upsert"
+DELETE_URL = f"{ENDEE_URL}/index/delete"
 
 SINGLE_INDEX_NAME = "enterprise_knowledge_base2"
 HYBRID_INDEX_NAME = "enterprise_knowledge_base2_hybrid"
 
-# Performing list slicing because, insertion limit is 1000 vectors, and I am keeping 950 vectors per upsert
-def get_slices(vectors, batch_size=950):
+# endee-service splits large upserts to the DB limit of 1000 vectors itself,
+# so the client only slices to keep each HTTP request at a reasonable size
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "5000"))
+
+def get_slices(vectors, batch_size=UPSERT_BATCH_SIZE):
     slices = []
     for start in range(0, len(vectors), batch_size):
         end = min(start + batch_size, len(vectors))
         slices.append((start, end))
     return slices
 
-# This is the function to UPSERT the VECTORS into DB
-def upsertVectors(payload, URL):
+
+# Connections to endee-service are kept alive and shared by all upload threads
+UPSERT_TIMEOUT = float(os.getenv("UPSERT_TIMEOUT", "60"))
+UPSERT_RETRIES = int(os.getenv("UPSERT_RETRIES", "3"))
+UPSERT_BACKOFF = float(os.getenv("UPSERT_BACKOFF", "0.5"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+UPSERT_MAX_IN_FLIGHT = int(os.getenv("UPSERT_MAX_IN_FLIGHT", "4"))
+
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(UPSERT_WORKERS, 1) * 2)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
+upsert_executor = ThreadPoolExecutor(max_workers=max(UPSERT_WORKERS, 1))
+
+
+def _error_message(response):
     try:
-        response = requests.post(
-            URL,
-            json=payload,
-            timeout=15
-        )
-        response.raise_for_status()
+        return response.json().get("error", "HTTP error occurred")
+    except ValueError:
+        return response.text
 
-        return {
-            "success": True,
-            "message": "Vectors upserted successfully",
-            "data": response.json()
-        }
 
-    except ConnectionError:
-        return {
-            "success": False,
-            "message": "Backend service is not reachable",
-            "data": None
-        }
+# Only errors of the hop to endee-service are retried here: timeouts, dropped
+# connections, 429/503 (busy) and 502/504 from a proxy. A 500 means the service
+# already gave up after its own retries towards endee-db.
+RETRIABLE_STATUS_CODES = {429, 502, 503, 504}
 
-    except Timeout:
-        return {
-            "success": False,
-            "message": "Request timed out",
-            "data": None
-        }
 
-    except HTTPError as e:
+def _is_retriable(error):
+    if isinstance(error, (ConnectionError, Timeout)):
+        return True
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code in RETRIABLE_STATUS_CODES
+    return False
+
+
+# POSTs a payload to endee-service (upserts and deletes), retried with exponential backoff
+def post_with_retries(payload, URL, success_message="Request succeeded",
+                      retries=UPSERT_RETRIES, backoff=UPSERT_BACKOFF):
+    attempts = 0
+    while True:
+        attempts += 1
         try:
-            err = e.response.json()
+            response = session.post(
+                URL,
+                timeout=UPSERT_TIMEOUT,
+                **request_body(payload)
+            )
+            response.raise_for_status()
+            data = response.json()
+
+            # 207: endee-service stored only part of the request
+            if response.status_code == 207:
+                return {
+                    "success": False,
+                    "message": data.get("status", "Request partially succeeded"),
+                    "data": data,
+                    "attempts": attempts
+                }
+
             return {
-                "success": False,
-                "message": err.get("error", "HTTP error occurred"),
-                "data": None
+                "success": True,
+                "message": success_message,
+                "data": data,
+                "attempts": attempts
             }
-        except ValueError:
+
+        except Exception as e:
+            if _is_retriable(e) and attempts <= retries:
+                time.sleep(backoff * 2 ** (attempts - 1))
+                continue
+
+            if isinstance(e, ConnectionError):
+                message = "Backend service is not reachable"
+            elif isinstance(e, Timeout):
+                message = "Request timed out"
+            elif isinstance(e, HTTPError):
+                message = _error_message(e.response)
+            else:
+                message = f"Unexpected error: {str(e)}"
+
             return {
                 "success": False,
-                "message": e.response.text,
-                "data": None
+                "message": message,
+                "data": None,
+                "attempts": attempts
             }
 
-    except Exception as e:
-        return {
-            "success": False,
-            "message": f"Unexpected error: {str(e)}",
-            "data": None
-        }
+
+# This is the function to UPSERT the VECTORS into DB
+def upsertVectors(payload, URL):
+    return post_with_retries(payload, URL, success_message="Vectors upserted successfully")
 
 
-def batch_upsert_vectors(vectors, INDEX_NAME, URL):
-    slices = get_slices(vectors)
-    result = {}
+"""
+Uploads the slices concurrently on the shared pool, with at most
+max_in_flight slices of this call queued or running, and reports the
+outcome of every slice instead of only the last one.
+"""
+def batch_upsert_vectors(vectors, INDEX_NAME, URL, max_in_flight=UPSERT_MAX_IN_FLIGHT):
+    started = time.perf_counter()
+    report, in_flight = [], set()
 
-    for start, end in slices:
+    for number, (start, end) in enumerate(get_slices(vectors)):
         payload = {
             "index_name": INDEX_NAME,
             "embedded_vectors": vectors[start: end]
         }
 
-        result = upsertVectors(payload, URL)
-    
-    return result
+        while len(in_flight) >= max(max_in_flight, 1):
+            _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        future = upsert_executor.submit(upsertVectors, payload, URL)
+        in_flight.add(future)
+        report.append({"slice": number, "start": start, "count": end - start, "future": future})
+
+    for entry in report:
+        result = entry.pop("future").result()
+        entry.update({
+            "success": result["success"],
+            "attempts": result["attempts"],
+            "message": result["message"]
+        })
+
+    elapsed = time.perf_counter() - started
+    upserted = sum(entry["count"] for entry in report if entry["success"])
+    failed = [entry for entry in report if not entry["success"]]
+    data = {
+        "count": upserted,
+        "total": len(vectors),
+        "succeeded_slices": len(report) - len(failed),
+        "failed_slices": len(failed),
+        "elapsed_seconds": round(elapsed, 4),
+        "vectors_per_second": round(upserted / elapsed, 2) if elapsed > 0 else None,
+        "slices": report
+    }
+
+    if failed:
+        return {
+            "success": False,
+            "message": f"{len(failed)} of {len(report)} slices failed: {failed[0]['message']}",
+            "data": data
+        }
+    return {
+        "success": True,
+        "message": "Vectors upserted successfully",
+        "data": data
+    }
 
 
 def upsert_single_index(vectors):
@@ -91,4 +180,83 @@ def upsert_single_index(vectors):
 
 
 def upsert_hybrid_index(vectors):
-    return batch_upsert_vectors(vectors, HYBRID_INDEX_NAME, HYBRID_INDEX_QUERY_URL)
\ No newline at end of file
+    return batch_upsert_vectors(vectors, HYBRID_INDEX_NAME, HYBRID_INDEX_QUERY_URL)
+
+
+# Deletes vectors by id (same endpoint for both indexes), stopping at the first failed slice
+def delete_vectors(ids, INDEX_NAME):
+    result = {"success": True, "message": "No vectors to delete", "data": None}
+
+    for start, end in get_slices(ids):
+        payload = {
+            "index_name": INDEX_NAME,
+            "ids": ids[start: end]
+        }
+
+        result = post_with_retries(payload, DELETE_URL, success_message="Vectors deleted successfully")
+        if not result["success"]:
+            return result
+        if result["data"].get("failed"):
+            return {
+                "success": False,
+                "message": "Some vectors could not be deleted",
+                "data": result["data"]
+            }
+
+    return result
+
+
+def delete_single_index(ids):
+    return delete_vectors(ids, SINGLE_INDEX_NAME)
+
+
+def delete_hybrid_index(ids):
+    return delete_vectors(ids, HYBRID_INDEX_NAME)
+
+
+# First id of the chunks ingested before content-hash ids
+LEGACY_FIRST_ID = 6000
+# Every LEGACY_PROBE_STRIDE-th legacy id is deleted first to find out whether there are any
+LEGACY_PROBE_STRIDE = 100
+
+
+"""
+Chunks used to be stored under consecutive integer ids starting at 6000;
+with content-hash ids those vectors are no longer tracked by the manifest
+and would stay in the index forever. This deletes them block by block
+from LEGACY_FIRST_ID on, and stops after max_empty_blocks blocks in a row
+in which nothing was deleted (a failed upload of the old client could
+leave a gap of one slice).
+
+endee-service deletes one id per DB call, so a sample of the ids the sweep
+would cover before stopping is deleted first; when none of them existed
+the index holds no legacy vectors and the sweep is skipped.
+"""
+def purge_legacy_vectors(INDEX_NAME, first_id=LEGACY_FIRST_ID, block_size=UPSERT_BATCH_SIZE, max_empty_blocks=2):
+    probe = range(first_id, first_id + block_size * max_empty_blocks, LEGACY_PROBE_STRIDE)
+    result = delete_vectors([str(i) for i in probe], INDEX_NAME)
+    if not result["success"]:
+        return {**result, "data": {"deleted": 0}}
+    deleted = result["data"]["deleted"]
+    if not deleted:
+        return {
+            "success": True,
+            "message": "No legacy vectors found",
+            "data": {"deleted": 0}
+        }
+
+    empty_blocks, start = 0, first_id
+    while empty_blocks < max_empty_blocks:
+        result = delete_vectors([str(i) for i in range(start, start + block_size)], INDEX_NAME)
+        if not result["success"]:
+            return {**result, "data": {"deleted": deleted}}
+        count = result["data"]["deleted"]
+        deleted += count
+        empty_blocks = 0 if count else empty_blocks + 1
+        start += block_size
+
+    return {
+        "success": True,
+        "message": f"{deleted} legacy vectors deleted",
+        "data": {"deleted": deleted}
+    }
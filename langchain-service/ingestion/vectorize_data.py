@@ -1,20 +1,107 @@
-from rag.embeddings import load_embeddingModel, sparse_encoder
+import os
+from functools import lru_cache
+import numpy as np
+from rag.embeddings import (
+    EMBEDDING_MODEL,
+    SPARSE_MODEL,
+    INFERENCE_BACKEND,
+    ONNX_QUANTIZATION,
+    load_embeddingModel,
+    load_sparse_model,
+    model_revision,
+    sparse_encode_batch
+)
+from ingestion.embedding_cache import get_cache
+from ingestion.manifest import make_chunk_id
+
+# Chunks per forward pass of the dense model
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+SPARSE_THRESHOLD = 0.1
+
+# A model that is not downloaded yet has no revision; loading it fetches it
+def _revision(model_name, load):
+    revision = model_revision(model_name)
+    if revision is None:
+        load()
+        revision = model_revision(model_name) or "unknown"
+    return revision
+
+
+# Cache namespaces: a different model, revision, backend or quantization never
+# shares entries. Resolved once per process, on the first ingestion.
+@lru_cache(maxsize=None)
+def dense_cache_namespace():
+    revision = _revision(EMBEDDING_MODEL, load_embeddingModel)
+    return f"dense:{EMBEDDING_MODEL}@{revision}:{INFERENCE_BACKEND}:{ONNX_QUANTIZATION}"
+
+
+@lru_cache(maxsize=None)
+def sparse_cache_namespace():
+    revision = _revision(SPARSE_MODEL, load_sparse_model)
+    return f"sparse:{SPARSE_MODEL}@{revision}:{INFERENCE_BACKEND}:{ONNX_QUANTIZATION}:{SPARSE_THRESHOLD}"
+
+# Encodes all chunk texts in one call; SentenceTransformer orders them by
+# length internally so each batch is padded as little as possible, and
+# returns the embeddings in the input order. Chunks already in the on-disk
+# embedding cache are not encoded again.
+def embed_texts(texts, batch_size=EMBED_BATCH_SIZE):
+    if not texts:
+        return []
+    cache = get_cache(dense_cache_namespace())
+    cached = cache.lookup(texts) if cache else [None] * len(texts)
+    rows = [entry["dense"] if entry is not None else None for entry in cached]
+    missing = [i for i, row in enumerate(rows) if row is None]
+
+    if missing:
+        computed = load_embeddingModel().encode(
+            [texts[i] for i in missing],
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        if cache:
+            cache.store([texts[i] for i in missing], dense=computed)
+        for i, row in zip(missing, computed):
+            rows[i] = row
+    return np.vstack(rows)
+
+
+# SPLADE vectors of the texts, served from the embedding cache when possible
+def sparse_embed_texts(texts):
+    cache = get_cache(sparse_cache_namespace())
+    cached = cache.lookup(texts) if cache else [None] * len(texts)
+    missing = [i for i, entry in enumerate(cached) if entry is None or entry["sparse"] is None]
+
+    results = [entry["sparse"] if entry is not None else None for entry in cached]
+    if missing:
+        computed = sparse_encode_batch([texts[i] for i in missing], threshold=SPARSE_THRESHOLD)
+        if cache:
+            cache.store([texts[i] for i in missing], sparse=computed)
+        for i, value in zip(missing, computed):
+            results[i] = value
+    return results
+
+
+# Chunk ids come from the ingestion pipeline (see ingestion/manifest.py); chunks
+# vectorized directly get the same kind of id from their source and text
+def chunk_vector_id(chunk):
+    return chunk.metadata.get("chunk_id") or make_chunk_id(chunk.metadata.get("source", ""), chunk.page_content)
 
-embeddingModel = load_embeddingModel()
 
 def vectorize_single_index(chunks):
-    start_idx = 6000
     documents = []
+    embeddings = embed_texts([chunk.page_content for chunk in chunks])
 
     for id, chunk in enumerate(chunks):
         source = chunk.metadata.get('source', "")
         title = chunk.metadata.get("title", "")
         description = chunk.metadata.get("description", "")
         text = chunk.page_content
-        embedding = embeddingModel.encode(text).tolist()
+        embedding = embeddings[id].tolist()
 
         data = {
-            "id": id + start_idx,
+            "id": chunk_vector_id(chunk),
             "vector": embedding,
             "meta": {
                 "title": title,
@@ -28,9 +115,11 @@ def vectorize_single_index(chunks):
 
 
 def vectorize_hybrid_index(chunks):
-    start_idx = 6000
     documents = []
     skipped = 0
+    texts = [chunk.page_content for chunk in chunks]
+    embeddings = embed_texts(texts)
+    sparse_vectors = sparse_embed_texts(texts)
 
     for id, chunk in enumerate(chunks):
         source = chunk.metadata.get('source', "")
@@ -39,19 +128,16 @@ def vectorize_hybrid_index(chunks):
         text = chunk.page_content
 
         # Vector Embeddings 
-        embedding = embeddingModel.encode(text).tolist()
-        if len(embedding) != embeddingModel.get_sentence_embedding_dimension():
-            skipped += 1
-            continue
+        embedding = embeddings[id].tolist()
 
         # Sparse Indices and Values for Hybrid Search
-        sparse_indices, sparse_values = sparse_encoder(text)
+        sparse_indices, sparse_values = sparse_vectors[id]
         if len(sparse_indices) != len(sparse_values):
             skipped += 1
             continue
 
         data = {
-            "id": id + start_idx,
+            "id": chunk_vector_id(chunk),
             "vector": embedding,
             "sparse_indices": sparse_indices,
             "sparse_values": sparse_values,
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+"""
+Semantic cache of generated answers, shared by every Streamlit session of
+the process.
+
+A question is answered from the cache when a previous question of the same
+scope (mode, company name, bot name and custom prompt) has a dense query
+embedding with a cosine similarity of at least ANSWER_CACHE_THRESHOLD, so
+rewordings of the same question skip retrieval and the LLM call.
+
+Ingesting documents calls invalidate(), which empties the cache; answers
+still being generated at that moment are not stored. Ingestion from another
+process (the ingestion CLI) cannot reach this cache, so entries also expire
+after ANSWER_CACHE_TTL seconds. At most ANSWER_CACHE_SIZE entries are kept,
+least recently used evicted first.
+"""
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class SemanticAnswerCache:
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL):
+        self.max_size = max_size
+        self.threshold = threshold
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.generation = 0
+        self.lookups = 0
+        self.hits = 0
+        self.seconds_saved = 0.0
+        self.invalidations = 0
+
+    def _expired(self, entry, now):
+        return self.ttl > 0 and now - entry["created"] > self.ttl
+
+    """
+    Returns (entry, generation). entry is None on a miss, otherwise a dict
+    with the cached "answer", the "similarity" of the matched question and
+    the "seconds" its generation took. generation is passed back to store(),
+    so answers that started before an invalidation are dropped.
+    """
+    def lookup(self, scope, query_vector):
+        if self.max_size <= 0:
+            return None, self.generation
+        query_vector = _normalize(query_vector)
+        now = time.time()
+        with self._lock:
+            self.lookups += 1
+            for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+                del self._entries[key]
+
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry["scope"] == scope]
+            if candidates:
+                similarities = np.stack([entry["vector"] for _, entry in candidates]) @ query_vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.seconds_saved += entry["seconds"]
+                    return {
+                        "answer": entry["answer"],
+                        "similarity": round(float(similarities[best]), 4),
+                        "seconds": entry["seconds"],
+                    }, self.generation
+            return None, self.generation
+
+    def store(self, scope, query_vector, answer, seconds, generation):
+        if self.max_size <= 0 or not answer:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[self._next_id] = {
+                "scope": scope,
+                "vector": _normalize(query_vector),
+                "answer": answer,
+                "seconds": seconds,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # Called after documents are ingested: cached answers may no longer match the index
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 2),
+                "invalidations": self.invalidations,
+            }
+
+
+answer_cache = SemanticAnswerCache()
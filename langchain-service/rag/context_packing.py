@@ -0,0 +1,133 @@
+import os
+
+"""
+Assembles the retrieved chunks into the context of the prompt.
+
+Chunks are split with an overlap (see ingestion/chunking.py), so neighbours
+from the same source repeat text, and the same passage can come back twice
+from different files. Before the chunks go into the prompt they are
+
+- merged when they come from the same source and one ends with the start
+  of the other (or contains it),
+- dropped when they are near-duplicates of a chunk already kept, i.e. when
+  at least CONTEXT_DEDUP_THRESHOLD of the word trigrams of the smaller one
+  are also in the other (so a chunk contained in a longer one is caught),
+- ordered by similarity, best first,
+- packed until CONTEXT_TOKEN_BUDGET is reached.
+
+The Groq tokenizer is not available locally, so every token count here
+(the budget and the stats) is an estimate from the length of the text,
+len / CONTEXT_CHARS_PER_TOKEN (~4 characters per token for English), not a
+tokenizer count.
+"""
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "4"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.9"))
+# Shortest shared text taken as a chunk overlap, and longest one looked for
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 300
+SHINGLE_SIZE = 3
+SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text):
+    return int(len(text) / CONTEXT_CHARS_PER_TOKEN + 0.5)
+
+
+def _overlap(left, right):
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+# Joined text of two chunks of the same source, or None when they do not touch
+def _merge_texts(first, second):
+    if second in first:
+        return first
+    if first in second:
+        return second
+    size = _overlap(first, second)
+    if size:
+        return first + second[size:]
+    size = _overlap(second, first)
+    if size:
+        return second + first[size:]
+    return None
+
+
+def _shingles(text):
+    words = text.lower().split()
+    if len(words) <= SHINGLE_SIZE:
+        return {tuple(words)}
+    return {tuple(words[i: i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+# Containment rather than Jaccard: a short passage repeated inside a long one
+# shares few shingles with it relative to the union, but all of its own
+def _is_near_duplicate(shingles, other):
+    smaller = min(len(shingles), len(other))
+    return smaller > 0 and len(shingles & other) / smaller >= CONTEXT_DEDUP_THRESHOLD
+
+
+# Adds a chunk to the passages, merging it with (possibly several) neighbours of its source
+def _add_passage(passages, text, source, similarity):
+    for passage in passages:
+        if source is None or passage["source"] != source:
+            continue
+        merged = _merge_texts(passage["text"], text)
+        if merged is not None:
+            passages.remove(passage)
+            _add_passage(passages, merged, source, max(similarity, passage["similarity"]))
+            return
+    passages.append({"text": text, "source": source, "similarity": similarity})
+
+
+"""
+Returns (context, stats) for the retrieved docs. stats compares the packed
+context with plain concatenation of every chunk: chunk counts before/after,
+tokens before/after and tokens saved, all estimated from the length (see above).
+"""
+def pack_context(docs, token_budget=CONTEXT_TOKEN_BUDGET):
+    docs = sorted(docs, key=lambda d: d.metadata.get("similarity") or 0.0, reverse=True)
+    passages = []
+    for doc in docs:
+        text = doc.page_content.strip()
+        if text:
+            _add_passage(passages, text, doc.metadata.get("source"), doc.metadata.get("similarity") or 0.0)
+
+    # Near-duplicates across sources: the better ranked passage keeps its
+    # place, with the text of the longer one when it contains the other
+    passages.sort(key=lambda p: p["similarity"], reverse=True)
+    kept, kept_shingles = [], []
+    for passage in passages:
+        shingles = _shingles(passage["text"])
+        duplicate = next((i for i, other in enumerate(kept_shingles) if _is_near_duplicate(shingles, other)), None)
+        if duplicate is None:
+            kept.append(passage)
+            kept_shingles.append(shingles)
+        elif len(shingles) > len(kept_shingles[duplicate]):
+            kept[duplicate] = dict(passage, similarity=kept[duplicate]["similarity"])
+            kept_shingles[duplicate] = shingles
+
+    packed, used = [], 0
+    for passage in kept:
+        cost = estimate_tokens(passage["text"] + SEPARATOR)
+        if used + cost <= token_budget:
+            packed.append(passage["text"])
+            used += cost
+        elif not packed:
+            # The best passage alone is over budget: keep its beginning
+            packed.append(passage["text"][: int(token_budget * CONTEXT_CHARS_PER_TOKEN)])
+            used = estimate_tokens(packed[0])
+    context = SEPARATOR.join(packed)
+
+    tokens_in = estimate_tokens(SEPARATOR.join(d.page_content for d in docs))
+    tokens_out = estimate_tokens(context)
+    return context, {
+        "chunks_in": len(docs),
+        "chunks_out": len(packed),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": tokens_in - tokens_out,
+    }
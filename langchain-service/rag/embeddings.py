@@ -1,36 +1,138 @@
+import hashlib
+import os
+from pathlib import Path
+from huggingface_hub import try_to_load_from_cache
 from sentence_transformers import SentenceTransformer
 from transformers import AutoTokenizer, AutoModelForMaskedLM
 import torch
+from threadpoolctl import threadpool_limits
+from rag.model_registry import registry
+from rag import onnx_backend
 
-def load_embeddingModel(model_name = 'all-MiniLM-L6-v2'):
-    return SentenceTransformer('all-MiniLM-L6-v2')
+# Dense model; with EMBEDDING_MODEL_PINNED=true every caller gets this one,
+# whatever model_name it asks for (the indexes are created for its dimension)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_MODEL_PINNED = os.getenv("EMBEDDING_MODEL_PINNED", "false").lower() == "true"
+SPARSE_MODEL = "naver/splade-cocondenser-ensembledistil"
+
+# "torch" (eager PyTorch) or "onnx" (ONNX Runtime, see rag/onnx_backend.py);
+# ONNX_QUANTIZATION picks the int8 config of the ONNX models ("none" keeps fp32)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+ONNX_QUANTIZATION = os.getenv("ONNX_QUANTIZATION", "none").lower()
+INFERENCE_BACKENDS = {"torch", "onnx"}
+if INFERENCE_BACKEND not in INFERENCE_BACKENDS:
+    raise ValueError(f"INFERENCE_BACKEND must be one of {sorted(INFERENCE_BACKENDS)}")
+
+
+def build_dense_model(model_name, backend=INFERENCE_BACKEND, quantization=ONNX_QUANTIZATION):
+    if backend == "onnx":
+        return onnx_backend.load_dense(model_name, quantization)
+    return SentenceTransformer(model_name)
+
+
+def build_sparse_model(backend=INFERENCE_BACKEND, quantization=ONNX_QUANTIZATION):
+    if backend == "onnx":
+        return onnx_backend.load_sparse(SPARSE_MODEL, quantization)
+    return AutoModelForMaskedLM.from_pretrained(SPARSE_MODEL).eval()
+
+
+"""
+Identifies the weights a model name currently resolves to, without loading
+them: the commit of the Hugging Face snapshot in the local cache, or a hash
+of config.json for a model directory. SentenceTransformer also looks names
+without an organisation up under sentence-transformers/. None when the model
+has not been downloaded yet.
+"""
+def model_revision(model_name):
+    path = Path(model_name)
+    if path.is_dir():
+        config = path / "config.json"
+        content = config.read_bytes() if config.exists() else str(path.resolve()).encode("utf-8")
+        return hashlib.sha1(content).hexdigest()[:12]
+
+    candidates = [model_name] if "/" in model_name else [model_name, f"sentence-transformers/{model_name}"]
+    for repo_id in candidates:
+        cached = try_to_load_from_cache(repo_id, "config.json")
+        if isinstance(cached, str):
+            # <cache>/models--org--name/snapshots/<commit>/config.json
+            return Path(cached).parent.name
+    return None
+
+
+# Models are loaded lazily, once per process, through the shared registry
+def load_embeddingModel(model_name = None):
+    if EMBEDDING_MODEL_PINNED or not model_name:
+        model_name = EMBEDDING_MODEL
+    return registry.get(
+        ("dense", model_name, INFERENCE_BACKEND, ONNX_QUANTIZATION),
+        lambda: build_dense_model(model_name)
+    )
 
 def load_tokenizer():
-    return AutoTokenizer.from_pretrained("naver/splade-cocondenser-ensembledistil")
+    return registry.get(("tokenizer", SPARSE_MODEL), lambda: AutoTokenizer.from_pretrained(SPARSE_MODEL))
 
+# This is for SPLADE (To compute Sparse Vectors and Indices); only loaded when Pro mode needs it
 def load_sparse_model():
-    return AutoModelForMaskedLM.from_pretrained("naver/splade-cocondenser-ensembledistil")
+    return registry.get(
+        ("sparse", SPARSE_MODEL, INFERENCE_BACKEND, ONNX_QUANTIZATION),
+        build_sparse_model
+    )
 
-# This is for SPLADE (To compute Sparse Vectors and Indices)
-tokenizer = load_tokenizer()
-model = load_sparse_model()
+# Texts per SPLADE forward pass; the logits are (batch, tokens, 30522) floats,
+# so memory grows quickly with this
+SPARSE_BATCH_SIZE = int(os.getenv("SPARSE_BATCH_SIZE", "8"))
 
-def sparse_encoder(text, threshold=0.1):
-    inputs = tokenizer(text, return_tensors="pt", truncation=True)
+# Batched SPLADE: returns one (indices, values) pair per text, in input order
+# (model can be passed explicitly, e.g. to compare backends)
+def sparse_encode_batch(texts, threshold=0.1, batch_size=SPARSE_BATCH_SIZE, model=None):
+    tokenizer = load_tokenizer()
+    if model is None:
+        model = load_sparse_model()
+    results = [None] * len(texts)
+    # Texts of similar length share a batch, which keeps padding small
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+    for start in range(0, len(order), batch_size):
+        positions = order[start: start + batch_size]
+        inputs = tokenizer(
+            [texts[i] for i in positions],
+            return_tensors="pt",
+            truncation=True,
+            padding=True
+        )
+
+        with torch.inference_mode():
+            logits = model(**inputs).logits
 
-    with torch.no_grad():
-        logits = model(**inputs).logits
+        # SPLADE pooling; padded positions are zeroed (scores are >= 0) so they never win the max
+        scores = torch.log1p(torch.relu(logits))
+        scores = scores * inputs["attention_mask"].unsqueeze(-1)
+        scores = torch.max(scores, dim=1).values
 
-    # SPLADE pooling
-    scores = torch.log1p(torch.relu(logits))
-    scores = torch.max(scores, dim=1).values.squeeze()
+        rows, cols = torch.nonzero(scores > threshold, as_tuple=True)
+        values = scores[rows, cols]
+        counts = torch.bincount(rows, minlength=len(positions)).tolist()
 
-    indices = []
-    values = []
+        for position, indices, weights in zip(positions, cols.split(counts), values.split(counts)):
+            results[position] = (indices.tolist(), weights.tolist())
+
+    return results
+
+
+def sparse_encoder(text, threshold=0.1):
+    return sparse_encode_batch([text], threshold=threshold)[0]
 
-    for idx, score in enumerate(scores):
-        if score > threshold:
-            indices.append(idx)
-            values.append(float(score))
 
-    return indices, values
\ No newline at end of file
+"""
+Executor initializer of the query encoder threads: caps the torch intra-op
+(OpenMP) threads of the calling thread only. torch.set_num_threads is not
+used because it also changes the process-wide default that every thread
+started later picks up. torch initialises the OpenMP settings of a thread
+on its first parallel call and would overwrite the cap, so that is
+triggered first (get_num_threads does it). threads <= 0 keeps the default.
+"""
+def limit_thread_budget(threads):
+    if threads <= 0:
+        return
+    torch.get_num_threads()
+    threadpool_limits(limits=threads, user_api="openmp")
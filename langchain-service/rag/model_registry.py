@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+"""
+Process-wide registry of the models used by the app.
+
+Every model is loaded the first time it is asked for and then shared by the
+ingestion and retrieval code (and every Streamlit session of the process).
+Loads run one at a time under a registry-wide lock: concurrent first calls
+load a model only once, and two different models are never loaded at the
+same time (transformers' from_pretrained sets process-global state while
+it builds a model, so parallel loads, e.g. of both Pro mode encoders, can
+break each other). With MODEL_IDLE_TIMEOUT > 0, models not used for that many
+seconds are dropped and loaded again on the next use.
+"""
+MODEL_IDLE_TIMEOUT = float(os.getenv("MODEL_IDLE_TIMEOUT", "0"))
+
+
+class ModelRegistry:
+    def __init__(self, idle_timeout=0):
+        self.idle_timeout = idle_timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.RLock()
+        self._sweeper = None
+        self.loads = 0
+        self.evictions = 0
+
+    # Returns the model stored under key, calling loader() on first use
+    def get(self, key, loader):
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._load_lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = {"model": loader(), "last_used": time.monotonic()}
+                    with self._lock:
+                        self._entries[key] = entry
+                        self.loads += 1
+                    self._start_sweeper()
+        entry["last_used"] = time.monotonic()
+        return entry["model"]
+
+    def evict(self, key=None):
+        with self._lock:
+            keys = list(self._entries) if key is None else [key]
+            removed = [k for k in keys if self._entries.pop(k, None) is not None]
+            self.evictions += len(removed)
+        return removed
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [k for k, entry in self._entries.items() if entry["last_used"] < cutoff]
+        for key in idle:
+            self.evict(key)
+        return idle
+
+    def _start_sweeper(self):
+        if self.idle_timeout <= 0 or self._sweeper is not None:
+            return
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._sweeper = threading.Thread(target=self._sweep, name="model-registry-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep(self):
+        while True:
+            time.sleep(max(self.idle_timeout / 4, 1.0))
+            self.evict_idle()
+
+    def stats(self):
+        with self._lock:
+            loaded = {
+                str(key): round(time.monotonic() - entry["last_used"], 1)
+                for key, entry in self._entries.items()
+            }
+        return {
+            "loaded": loaded,
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "idle_timeout_seconds": self.idle_timeout,
+        }
+
+
+registry = ModelRegistry(idle_timeout=MODEL_IDLE_TIMEOUT)
@@ -0,0 +1,70 @@
+import os
+import re
+from pathlib import Path
+
+"""
+ONNX Runtime backend for the dense (MiniLM) and sparse (SPLADE) models.
+
+Models are exported to ONNX the first time they are needed and kept under
+ONNX_CACHE_DIR, so later starts only load the exported files. With a
+quantization config (avx2, avx512, avx512_vnni or arm64) the weights are
+additionally quantized to int8 with dynamic quantization, matching the
+instruction set of the CPU the app runs on.
+
+Needs the optional packages of requirements-onnx.txt (optimum[onnxruntime]).
+"""
+ONNX_CACHE_DIR = Path(os.getenv("ONNX_CACHE_DIR", os.path.expanduser("~/.cache/enterprise-rag/onnx")))
+QUANTIZATION_CONFIGS = {"none", "avx2", "avx512", "avx512_vnni", "arm64"}
+
+
+def _check_quantization(quantization):
+    if quantization not in QUANTIZATION_CONFIGS:
+        raise ValueError(f"ONNX quantization must be one of {sorted(QUANTIZATION_CONFIGS)}, got {quantization!r}")
+
+
+def _export_dir(kind, model_name):
+    return ONNX_CACHE_DIR / kind / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+# SentenceTransformer running on ONNX Runtime, optionally int8 quantized
+def load_dense(model_name, quantization="none"):
+    _check_quantization(quantization)
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    target = _export_dir("dense", model_name)
+    if not (target / "onnx" / "model.onnx").exists():
+        SentenceTransformer(model_name, backend="onnx").save_pretrained(str(target))
+    if quantization == "none":
+        return SentenceTransformer(str(target), backend="onnx")
+
+    file_name = f"onnx/model_qint8_{quantization}.onnx"
+    if not (target / file_name).exists():
+        export_dynamic_quantized_onnx_model(
+            SentenceTransformer(str(target), backend="onnx"),
+            quantization,
+            str(target)
+        )
+    return SentenceTransformer(str(target), backend="onnx", model_kwargs={"file_name": file_name})
+
+
+# Masked-LM head for SPLADE on ONNX Runtime; returns torch logits like the PyTorch model
+def load_sparse(model_name, quantization="none"):
+    _check_quantization(quantization)
+    from optimum.onnxruntime import ORTModelForMaskedLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    target = _export_dir("sparse", model_name)
+    if not (target / "model.onnx").exists():
+        ORTModelForMaskedLM.from_pretrained(model_name, export=True).save_pretrained(str(target))
+    if quantization == "none":
+        return ORTModelForMaskedLM.from_pretrained(str(target))
+
+    file_name = f"model_qint8_{quantization}.onnx"
+    if not (target / file_name).exists():
+        config = getattr(AutoQuantizationConfig, quantization)(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(str(target)).quantize(
+            save_dir=str(target),
+            quantization_config=config,
+            file_suffix=f"qint8_{quantization}"
+        )
+    return ORTModelForMaskedLM.from_pretrained(str(target), file_name=file_name)
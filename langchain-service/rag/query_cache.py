@@ -0,0 +1,78 @@
+import os
+import threading
+from collections import OrderedDict
+
+"""
+LRU cache of query embeddings, shared by every Streamlit session of the
+process (the module is imported once).
+
+Keys are the normalized query text, values the dense vector and, for Pro
+mode, the SPLADE (indices, values). Both models are uncased, so lowercasing
+and collapsing whitespace does not change the vectors; repeated questions
+then skip the forward passes entirely.
+
+Every session gets the same cached object, so values are stored as tuples
+(lists are converted, also inside the SPLADE pair) and cannot be modified
+in place by one caller under the feet of the others.
+"""
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def _frozen(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_frozen(item) for item in value)
+    return value
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size=QUERY_EMBEDDING_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+
+    # Returns the cached value of (kind, text), computing it with encode(text) on a miss
+    def get_or_compute(self, kind, text, encode):
+        key = (kind, text)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._hits[kind] = self._hits.get(kind, 0) + 1
+                return value
+            self._misses[kind] = self._misses.get(kind, 0) + 1
+
+        # Encoded outside the lock so other sessions are not blocked meanwhile
+        value = _frozen(encode(text))
+        if self.max_size > 0:
+            with self._lock:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            kinds = sorted(set(self._hits) | set(self._misses))
+            per_kind = {}
+            for kind in kinds:
+                hits, misses = self._hits.get(kind, 0), self._misses.get(kind, 0)
+                per_kind[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                }
+            return {"size": len(self._entries), "max_size": self.max_size, **per_kind}
+
+
+query_embedding_cache = QueryEmbeddingCache()
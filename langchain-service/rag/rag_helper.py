@@ -1,11 +1,11 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.documents import Document
 import requests
-from rag.embeddings import load_embeddingModel, sparse_encoder, load_tokenizer
+from rag.embeddings import load_embeddingModel, sparse_encoder, load_tokenizer, limit_thread_budget
 from requests.exceptions import ConnectionError, Timeout, HTTPError
-
-embeddingModel = load_embeddingModel()
-tokenizer = load_tokenizer()
+from rag.wire_format import request_body
+from rag.query_cache import query_embedding_cache, normalize_query
 
 ENDEE_URL = os.getenv(
     "ENDEE_SERVICE_URL",
@@ -19,6 +19,38 @@ HYBRID_INDEX_QUERY_URL = f"{ENDEE_URL}/index/hybrid/query"
 SINGLE_INDEX_NAME = "enterprise_knowledge_base2"
 HYBRID_INDEX_NAME = "enterprise_knowledge_base2_hybrid"
 
+# Only the fields the retrievers turn into Documents are requested
+RETRIEVER_FIELDS = ["id", "similarity", "text", "title", "description", "source"]
+
+# How Pro mode combines dense and sparse results (see the endee-service README)
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "native")
+HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))
+HYBRID_OVERFETCH = int(os.getenv("HYBRID_OVERFETCH", "2"))
+
+# Pro mode query encoding: "parallel" runs MiniLM and SPLADE at the same time
+# (torch releases the GIL), each on its own executor thread whose intra-op
+# threads are capped once, when the thread starts; SPLADE is the larger model
+# and gets most cores. "sequential" runs one after the other, and is the
+# default on a single CPU, where the two encoders can only take turns.
+QUERY_ENCODING = os.getenv(
+    "QUERY_ENCODING", "parallel" if (os.cpu_count() or 1) > 1 else "sequential"
+).lower()
+SPARSE_QUERY_THREADS = int(os.getenv("SPARSE_QUERY_THREADS", str(max(1, (os.cpu_count() or 1) * 2 // 3))))
+DENSE_QUERY_THREADS = int(os.getenv(
+    "DENSE_QUERY_THREADS", str(max(1, (os.cpu_count() or 1) - SPARSE_QUERY_THREADS))
+))
+# Encoder threads per model, i.e. how many Streamlit sessions can encode a
+# query at the same time; each thread gets the full budget above.
+QUERY_ENCODER_WORKERS = int(os.getenv("QUERY_ENCODER_WORKERS", "4"))
+dense_query_executor = ThreadPoolExecutor(
+    max_workers=QUERY_ENCODER_WORKERS, thread_name_prefix="dense-query-encoder",
+    initializer=limit_thread_budget, initargs=(DENSE_QUERY_THREADS,)
+)
+sparse_query_executor = ThreadPoolExecutor(
+    max_workers=QUERY_ENCODER_WORKERS, thread_name_prefix="sparse-query-encoder",
+    initializer=limit_thread_budget, initargs=(SPARSE_QUERY_THREADS,)
+)
+
 
 # This functions will create SINGLE and HYBRID indexed DBs.
 # Creates the DB whenever the app starts and checks if they are already created to avoid redundant creation.
@@ -30,7 +62,7 @@ def create_load_dbs():
             "create_url": f"{ENDEE_URL}/index/create",
             "payload": {
                 "index_name": SINGLE_INDEX_NAME,
-                "dimension": embeddingModel.get_sentence_embedding_dimension(),
+                "dimension": load_embeddingModel().get_sentence_embedding_dimension(),
                 "precision": "INT16D"
             }
         },
@@ -40,8 +72,8 @@ def create_load_dbs():
             "create_url": f"{ENDEE_URL}/index/hybrid/create",
             "payload": {
                 "index_name": HYBRID_INDEX_NAME,
-                "dimension": embeddingModel.get_sentence_embedding_dimension(),
-                "sparse_dimension": tokenizer.vocab_size,
+                "dimension": load_embeddingModel().get_sentence_embedding_dimension(),
+                "sparse_dimension": load_tokenizer().vocab_size,
                 "precision": "INT16D"
             }
         }
@@ -77,8 +109,8 @@ def create_load_dbs():
 def _endee_base_retriever(query_url: str, payload: dict):
     response = requests.post(
         query_url,
-        json=payload,
-        timeout=20
+        timeout=20,
+        **request_body(payload)
     )
     response.raise_for_status()
 
@@ -100,13 +132,36 @@ def _endee_base_retriever(query_url: str, payload: dict):
 
     return docs
 
+# Query vectors go through the shared LRU cache, so repeated questions skip the models
+def embed_query_dense(query: str):
+    return query_embedding_cache.get_or_compute(
+        "dense",
+        normalize_query(query),
+        lambda text: load_embeddingModel().encode(text).tolist()
+    )
+
+def embed_query_sparse(query: str):
+    return query_embedding_cache.get_or_compute("sparse", normalize_query(query), sparse_encoder)
+
+# Dense vector and SPLADE (indices, values) of a Pro mode query
+def embed_query_hybrid(query: str, parallel=None):
+    if parallel is None:
+        parallel = QUERY_ENCODING == "parallel"
+    if not parallel:
+        return embed_query_dense(query), embed_query_sparse(query)
+
+    sparse_future = sparse_query_executor.submit(embed_query_sparse, query)
+    dense_future = dense_query_executor.submit(embed_query_dense, query)
+    return dense_future.result(), sparse_future.result()
+
 def single_index_retriever(query: str):
-    dense_vector = embeddingModel.encode(query).tolist()
+    dense_vector = embed_query_dense(query)
 
     payload = {
         "index_name": SINGLE_INDEX_NAME,
         "vector": dense_vector,
-        "top_k": 20
+        "top_k": 20,
+        "fields": RETRIEVER_FIELDS
     }
 
     return _endee_base_retriever(
@@ -114,18 +169,25 @@ def single_index_retriever(query: str):
         payload=payload
     )
 
-def hybrid_index_retriever(query: str):
-    dense_vector = embeddingModel.encode(query).tolist()
-    sparse_indices, sparse_values = sparse_encoder(query)
+def hybrid_index_retriever(query: str, parallel=None):
+    dense_vector, (sparse_indices, sparse_values) = embed_query_hybrid(query, parallel)
 
     payload = {
         "index_name": HYBRID_INDEX_NAME,
         "vector": dense_vector,
         "sparse_indices": sparse_indices,
         "sparse_values": sparse_values,
-        "top_k": 20
+        "top_k": 20,
+        "fields": RETRIEVER_FIELDS
     }
 
+    if HYBRID_FUSION != "native":
+        payload.update({
+            "fusion": HYBRID_FUSION,
+            "alpha": HYBRID_ALPHA,
+            "overfetch": HYBRID_OVERFETCH
+        })
+
     return _endee_base_retriever(
         query_url=HYBRID_INDEX_QUERY_URL,
         payload=payload
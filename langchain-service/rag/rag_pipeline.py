@@ -1,4 +1,5 @@
 import os
+import time
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
@@ -6,6 +7,7 @@ from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_groq import ChatGroq
 from rag.rag_helper import single_index_retriever, hybrid_index_retriever
 from rag.prompts import system_prompt
+from rag.context_packing import pack_context
 
 # Retrievers
 single_retriever = RunnableLambda(single_index_retriever)
@@ -27,13 +29,18 @@ prompt = ChatPromptTemplate.from_messages([
     ("human", "{input}")
 ])
 
-def format_docs(docs):
-    return "\n\n".join(d.page_content for d in docs)
+# Retrieved chunks -> merged, deduplicated context within the token budget.
+# A dict passed as "context_stats" receives the packing stats of the query.
+def build_context(x, retriever):
+    context, stats = pack_context(retriever.invoke(x["input"]))
+    if isinstance(x.get("context_stats"), dict):
+        x["context_stats"].update(stats)
+    return context
 
 # Rag pipeline:
 single_rag_chain = (
     RunnablePassthrough.assign(
-        context=(lambda x: format_docs(single_retriever.invoke(x["input"])))
+        context=(lambda x: build_context(x, single_retriever))
     )
     | prompt
     | chatModel
@@ -42,9 +49,22 @@ single_rag_chain = (
 
 hybrid_rag_chain = (
     RunnablePassthrough.assign(
-        context=(lambda x: format_docs(hybrid_retriever.invoke(x["input"])))
+        context=(lambda x: build_context(x, hybrid_retriever))
     )
     | prompt
     | chatModel
     | StrOutputParser()
-)
\ No newline at end of file
+)
+
+"""
+Streams the answer of a chain chunk by chunk and fills timings with the
+time to the first non-empty chunk and the total generation time (seconds,
+measured from the call, so retrieval is included as the user sees it).
+"""
+def stream_with_timings(chain, payload, timings):
+    started = time.perf_counter()
+    for chunk in chain.stream(payload):
+        if chunk and "ttft_seconds" not in timings:
+            timings["ttft_seconds"] = round(time.perf_counter() - started, 3)
+        yield chunk
+    timings["total_seconds"] = round(time.perf_counter() - started, 3)
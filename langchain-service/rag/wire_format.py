@@ -0,0 +1,51 @@
+import os
+import msgpack
+import numpy as np
+
+"""
+Opt-in binary encoding of the payloads sent to endee-service.
+
+With ENDEE_WIRE_FORMAT=msgpack the vectors are packed as little-endian
+buffers (float32, or float16 with ENDEE_VECTOR_DTYPE=float16) inside a
+msgpack body, instead of JSON float lists. The default stays JSON.
+"""
+WIRE_FORMAT = os.getenv("ENDEE_WIRE_FORMAT", "json").lower()
+VECTOR_DTYPE = os.getenv("ENDEE_VECTOR_DTYPE", "float32").lower()
+
+VECTOR_DTYPES = {
+    "float32": np.dtype("<f4"),
+    "float16": np.dtype("<f2"),
+}
+SPARSE_INDEX_DTYPE = np.dtype("<i4")
+SPARSE_VALUE_DTYPE = np.dtype("<f4")
+
+
+def _pack_vector_fields(item, vector_dtype):
+    packed = dict(item)
+    if packed.get("vector") is not None:
+        packed["vector"] = np.asarray(packed["vector"], dtype=vector_dtype).tobytes()
+    if packed.get("sparse_indices") is not None:
+        packed["sparse_indices"] = np.asarray(packed["sparse_indices"], dtype=SPARSE_INDEX_DTYPE).tobytes()
+    if packed.get("sparse_values") is not None:
+        packed["sparse_values"] = np.asarray(packed["sparse_values"], dtype=SPARSE_VALUE_DTYPE).tobytes()
+    return packed
+
+
+def encode_msgpack(payload, dtype=VECTOR_DTYPE):
+    vector_dtype = VECTOR_DTYPES[dtype]
+    body = _pack_vector_fields(payload, vector_dtype)
+    for key in ("embedded_vectors", "queries"):
+        if isinstance(body.get(key), list):
+            body[key] = [_pack_vector_fields(item, vector_dtype) for item in body[key]]
+    body["dtype"] = dtype
+    return msgpack.packb(body, use_bin_type=True)
+
+
+# Keyword arguments for requests.post(), in the configured wire format
+def request_body(payload, wire_format=WIRE_FORMAT):
+    if wire_format != "msgpack":
+        return {"json": payload}
+    return {
+        "data": encode_msgpack(payload),
+        "headers": {"Content-Type": "application/msgpack"},
+    }
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests import the packages the way the app does, from the service directory
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
@@ -0,0 +1,67 @@
+import numpy as np
+from ingestion.embedding_cache import EmbeddingCache
+
+
+def dense_rows(*values):
+    return np.array([[v, v + 1.0] for v in values], dtype=np.float32)
+
+
+def test_lookup_returns_stored_dense_and_sparse_parts(tmp_path):
+    cache = EmbeddingCache("model-a", max_entries=10, directory=tmp_path)
+    cache.store(["one", "two"], dense=dense_rows(1.0, 2.0), sparse=[([3, 7], [0.5, 1.5]), ([1], [2.0])])
+
+    one, missing, two = cache.lookup(["one", "three", "two"])
+    assert missing is None
+    np.testing.assert_array_equal(one["dense"], [1.0, 2.0])
+    assert one["sparse"] == ([3, 7], [0.5, 1.5])
+    np.testing.assert_array_equal(two["dense"], [2.0, 3.0])
+    assert cache.stats()["hits"] == 2
+
+
+def test_entries_survive_a_new_run(tmp_path):
+    EmbeddingCache("model-a", max_entries=10, directory=tmp_path).store(["one"], dense=dense_rows(1.0))
+
+    reopened = EmbeddingCache("model-a", max_entries=10, directory=tmp_path)
+    np.testing.assert_array_equal(reopened.lookup(["one"])[0]["dense"], [1.0, 2.0])
+
+
+def test_namespaces_do_not_share_entries(tmp_path):
+    EmbeddingCache("model-a", max_entries=10, directory=tmp_path).store(["one"], dense=dense_rows(1.0))
+    assert EmbeddingCache("model-b", max_entries=10, directory=tmp_path).lookup(["one"]) == [None]
+
+
+def test_sparse_is_kept_when_only_dense_is_stored_again(tmp_path):
+    cache = EmbeddingCache("model-a", max_entries=10, directory=tmp_path)
+    cache.store(["one"], dense=dense_rows(1.0), sparse=[([3], [0.5])])
+    cache.store(["one"], dense=dense_rows(5.0))
+
+    entry = cache.lookup(["one"])[0]
+    np.testing.assert_array_equal(entry["dense"], [5.0, 6.0])
+    assert entry["sparse"] == ([3], [0.5])
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("ingestion.embedding_cache.time.time", lambda: now[0])
+    cache = EmbeddingCache("model-a", max_entries=2, directory=tmp_path)
+    cache.store(["one", "two"], dense=dense_rows(1.0, 2.0))
+    now[0] += 1
+    cache.lookup(["one"])
+    now[0] += 1
+    cache.store(["three"], dense=dense_rows(3.0))
+
+    one, two, three = cache.lookup(["one", "two", "three"])
+    assert two is None
+    np.testing.assert_array_equal(one["dense"], [1.0, 2.0])
+    np.testing.assert_array_equal(three["dense"], [3.0, 4.0])
+    assert cache.stats()["evictions"] == 1
+
+
+def test_a_smaller_cap_drops_the_slots_past_it(tmp_path):
+    EmbeddingCache("model-a", max_entries=4, directory=tmp_path).store(
+        ["a", "b", "c", "d"], dense=dense_rows(1.0, 2.0, 3.0, 4.0)
+    )
+    smaller = EmbeddingCache("model-a", max_entries=2, directory=tmp_path)
+    assert smaller.lookup(["a", "b", "c", "d"]) == [None, None, None, None]
+    smaller.store(["e"], dense=dense_rows(5.0))
+    np.testing.assert_array_equal(smaller.lookup(["e"])[0]["dense"], [5.0, 6.0])
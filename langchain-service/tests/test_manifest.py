@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+from ingestion.manifest import IngestionManifest, assign_chunk_ids, file_hash, make_chunk_id
+
+
+def chunk(text):
+    return SimpleNamespace(page_content=text, metadata={})
+
+
+def test_chunk_ids_depend_on_document_and_text_only():
+    assert make_chunk_id("a.pdf", "leave policy") == make_chunk_id("a.pdf", "leave policy")
+    assert make_chunk_id("a.pdf", "leave policy") != make_chunk_id("b.pdf", "leave policy")
+    assert make_chunk_id("a.pdf", "leave policy") != make_chunk_id("a.pdf", "leave policy v2")
+
+
+def test_assign_chunk_ids_stores_them_in_the_metadata():
+    chunks = [chunk("first"), chunk("second")]
+    ids = assign_chunk_ids("a.pdf", chunks)
+    assert ids == [c.metadata["chunk_id"] for c in chunks]
+    assert ids == [make_chunk_id("a.pdf", "first"), make_chunk_id("a.pdf", "second")]
+
+
+def test_file_hash_follows_the_content(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("v1")
+    first = file_hash(path)
+    path.write_text("v2")
+    assert file_hash(path) != first
+
+
+def test_manifest_round_trip_and_change_detection(tmp_path):
+    manifest = IngestionManifest("docs", directory=tmp_path)
+    manifest.record("a.pdf", "hash-1", ["id-2", "id-1", "id-1"])
+    manifest.save()
+
+    reloaded = IngestionManifest("docs", directory=tmp_path)
+    assert reloaded.get("a.pdf")["chunk_ids"] == ["id-1", "id-2"]
+    assert reloaded.is_unchanged("a.pdf", "hash-1")
+    assert not reloaded.is_unchanged("a.pdf", "hash-2")
+    assert not reloaded.is_unchanged("b.pdf", "hash-1")
+
+
+def test_incremental_sync_of_a_changed_document(tmp_path):
+    old_chunks = [chunk("intro"), chunk("leave: 20 days")]
+    manifest = IngestionManifest("docs", directory=tmp_path)
+    manifest.record("a.pdf", "hash-1", assign_chunk_ids("a.pdf", old_chunks))
+    manifest.save()
+
+    manifest = IngestionManifest("docs", directory=tmp_path)
+    previous = set(manifest.get("a.pdf")["chunk_ids"])
+    new_ids = assign_chunk_ids("a.pdf", [chunk("intro"), chunk("leave: 25 days")])
+
+    # The unchanged chunk keeps its id, so only one is upserted and one deleted
+    assert [i for i in new_ids if i not in previous] == [make_chunk_id("a.pdf", "leave: 25 days")]
+    assert previous - set(new_ids) == {make_chunk_id("a.pdf", "leave: 20 days")}
+
+
+def test_removed_documents_and_unknown_versions(tmp_path):
+    manifest = IngestionManifest("docs", directory=tmp_path)
+    manifest.record("a.pdf", "hash-1", ["id-1"])
+    manifest.remove("a.pdf")
+    manifest.save()
+    assert IngestionManifest("docs", directory=tmp_path).get("a.pdf") is None
+
+    (tmp_path / "other.json").write_text('{"version": 999, "documents": {"a.pdf": {}}}')
+    assert IngestionManifest("other", directory=tmp_path).documents == {}
@@ -0,0 +1,32 @@
+from rag.query_cache import QueryEmbeddingCache, normalize_query
+
+
+def test_cached_values_are_shared_but_immutable():
+    cache = QueryEmbeddingCache(max_size=4)
+    calls = []
+
+    def encode(text):
+        calls.append(text)
+        return [[1, 2], [0.5, 0.25]]
+
+    first = cache.get_or_compute("sparse", "q", encode)
+    second = cache.get_or_compute("sparse", "q", encode)
+    assert calls == ["q"]
+    assert first is second
+    assert first == ((1, 2), (0.5, 0.25))
+
+
+def test_least_recently_used_query_is_evicted():
+    cache = QueryEmbeddingCache(max_size=2)
+    for text in ("a", "b"):
+        cache.get_or_compute("dense", text, lambda t: [1.0])
+    cache.get_or_compute("dense", "a", lambda t: [1.0])
+    cache.get_or_compute("dense", "c", lambda t: [1.0])
+
+    assert cache.stats()["dense"] == {"hits": 1, "misses": 3, "hit_rate": 0.25}
+    cache.get_or_compute("dense", "b", lambda t: [2.0])
+    assert cache.stats()["dense"]["misses"] == 4
+
+
+def test_normalize_query():
+    assert normalize_query("  How many   Leave days?\n") == "how many leave days?"